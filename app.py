@@ -1,18 +1,117 @@
 import streamlit as st
 import logging
-from src.pdf_processor import extract_text_from_pdf
-from src.summary_generator import generate_summary
-from src.quiz_generator import generate_quiz
-from src.ui_components import display_interactive_quiz, display_summary
-from assets.styles import apply_custom_css
-import requests
+from src.pdf_processor import extract_document_from_pdf
+from src.document_store import document_store
+from src.corpus import explain_corpus_answers, extract_corpus, generate_corpus_quiz, generate_corpus_summary
+from src.summary_generator import generate_summary, is_summary_error
+from src.question_bank import generate_quiz_from_bank, seed_question_bank
+from src.quiz_generator import QUIZ_EXPLANATIONS, generate_explanations
+from src.prefetch import (PREFETCH_ON_UPLOAD, PREFETCH_START_WAIT_SECONDS, PrefetchLease, cancel_prefetch,
+                          get_prefetch, start_prefetch)
+from src.llm_interface import MODEL_NAME, check_ollama_status
+from src.profiling import PROFILE_ON_REQUEST, profile_request
+from ui.components import display_interactive_quiz, display_summary
+from ui.styles import apply_styles
+import uuid
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Ollama model configuration
-MODEL_NAME = "llama3:latest"
+def stored(key):
+    """Return a value this session keeps in the shared document store, or None."""
+    handle = st.session_state.get(key)
+    return handle.value if handle is not None else None
+
+def profiling_requested():
+    """Return True if this visitor asked for profiling with ?profile=1 and the server allows it."""
+    if not PROFILE_ON_REQUEST:
+        return None
+    query_params = getattr(st, "query_params", None)  # Streamlit 1.30+
+    if query_params is not None:
+        value = query_params.get("profile")
+    else:
+        value = (st.experimental_get_query_params().get("profile") or [None])[0]
+    return True if value == "1" else None
+
+def corpus_mode(uploaded_files, session_id, profiling):
+    """Summarize and quiz several uploaded PDFs together."""
+    if "corpus" not in st.session_state:
+        with st.spinner(f"Reading {len(uploaded_files)} documents... This may take a moment."), profile_request(f"corpus-{session_id[:8]}", enabled=profiling):
+            # Worker processes need the raw bytes; getvalue() hands over the upload's buffer without copying it
+            corpus, errors = extract_corpus([(file.name, file.getvalue()) for file in uploaded_files])
+        for error in errors:
+            st.error(error)
+        if corpus is None:
+            return
+        st.session_state.corpus = corpus
+    corpus = st.session_state.corpus
+
+    stats = corpus.stats
+    st.info(f"✅ {len(corpus.documents)} documents ready ({stats['pages']} pages).")
+    if stats["duplicate_pages"]:
+        st.caption(
+            f"Skipped {stats['duplicate_pages']} pages repeated across documents "
+            f"(~{stats['tokens_saved']:,} prompt tokens)."
+        )
+    if stats["duplicate_documents"]:
+        st.caption(f"Already covered by other files: {', '.join(stats['duplicate_documents'])}")
+
+    tab1, tab2 = st.tabs([" Summary", " Quiz"])
+
+    with tab1:
+        st.header("Course Summary")
+        if st.button(" Generate Summary", key="gen_corpus_summary") or st.session_state.get("corpus_summary"):
+            if not st.session_state.get("corpus_summary"):
+                with st.spinner("Summarizing each document and combining them... This may take a few minutes."), profile_request(f"corpus-summary-{session_id[:8]}", enabled=profiling):
+                    st.session_state.corpus_summary = generate_corpus_summary(corpus, session_id=session_id)
+
+            result = st.session_state.corpus_summary
+            if "error" in result:
+                st.error(result["error"])
+                st.session_state.corpus_summary = None  # Let the user retry; finished documents are cached
+            else:
+                display_summary(result["summary"])
+                for document in result["documents"]:
+                    with st.expander(f"📄 {document['name']}"):
+                        st.markdown(document["summary"])
+
+    with tab2:
+        st.header("Interactive Quiz")
+        if st.button(" Generate Quiz", key="gen_corpus_quiz") or st.session_state.get("quiz_data"):
+            if not st.session_state.get("quiz_data"):
+                with st.spinner("Creating quiz questions from every document... This may take a few minutes."), profile_request(f"corpus-quiz-{session_id[:8]}", enabled=profiling):
+                    quiz = generate_corpus_quiz(corpus, session_id=session_id)
+                if "error" in quiz:
+                    st.error(quiz["error"])  # Not kept, so the button can retry
+                else:
+                    st.session_state.quiz_data = quiz
+                    st.session_state.user_answers = [""] * len(quiz["questions"])
+                    st.session_state.quiz_submitted = False
+                    st.session_state.score = 0
+
+            if st.session_state.get("quiz_data"):
+                for warning in st.session_state.quiz_data.get("warnings", []):
+                    st.warning(f"No questions from {warning}")
+                display_interactive_quiz(
+                    st.session_state.quiz_data,
+                    # Not rate limited, like the single-document explanations
+                    explain_answers=lambda questions: explain_corpus_answers(corpus, questions),
+                    explain_wrong_only=QUIZ_EXPLANATIONS == "wrong"
+                )
+
+        if st.session_state.get("quiz_data") and st.button("🔄 Create New Quiz", key="new_corpus_quiz"):
+            # Each document's question bank serves questions this session has not seen yet
+            with st.spinner("Generating new quiz questions..."), profile_request(f"new-corpus-quiz-{session_id[:8]}", enabled=profiling):
+                quiz = generate_corpus_quiz(corpus, session_id=session_id)
+            if "error" in quiz:
+                st.error(quiz["error"])
+            else:
+                st.session_state.quiz_data = quiz
+                st.session_state.user_answers = [""] * len(quiz["questions"])
+                st.session_state.quiz_submitted = False
+                st.session_state.score = 0
+                st.rerun()
 
 def main():
     """Main Streamlit app function"""
@@ -25,54 +124,132 @@ def main():
     )
     
     # Apply custom CSS for better styling
-    apply_custom_css()
+    apply_styles()
     
     # Title 
     st.title("📚 Quiz & Summary Generator")
     
     st.markdown("""
-    Upload a PDF file and the system will help you:
+    Upload a PDF file (or several, such as a whole course) and the system will help you:
     1. Generate a comprehensive summary of the document's content
     2. Create an interactive multiple-choice quiz based on its content
     
     Perfect for students, educators, and anyone looking to extract key information from documents!
     """)
     
-    # Check Ollama availability
-    try:
-        response = requests.get("http://localhost:11434/api/tags")  
-        models = [model["name"] for model in response.json()["models"]]
-        if MODEL_NAME not in models:
-            st.warning(f"Model '{MODEL_NAME}' is not available in Ollama. Pull it using: `ollama pull {MODEL_NAME}`")
-    except requests.RequestException:
+    # Check Ollama availability once per session instead of on every rerun
+    # (a failed check is retried on the next rerun)
+    if "ollama_status" not in st.session_state:
+        is_connected, models = check_ollama_status()
+        if is_connected:
+            st.session_state.ollama_status = (is_connected, models)
+    else:
+        is_connected, models = st.session_state.ollama_status
+
+    if not is_connected:
         st.error("Cannot connect to Ollama API. Make sure it's running on port 11434.")
+    elif MODEL_NAME not in models:
+        st.warning(f"Model '{MODEL_NAME}' is not available in Ollama. Pull it using: `ollama pull {MODEL_NAME}`")
 
     # File upload section with improved UI
     st.markdown("### 📄 Upload Your Document")
-    uploaded_file = st.file_uploader("Choose a PDF file", type=["pdf"], 
-                                      help="Upload any PDF document to generate a summary and quiz")
+    uploaded_files = st.file_uploader("Choose PDF files", type=["pdf"], accept_multiple_files=True,
+                                      help="Upload one PDF, or several (e.g. a whole course) to summarize and quiz them together")
+    uploaded_file = uploaded_files[0] if len(uploaded_files or []) == 1 else None
+
+    prefetch_enabled = st.checkbox(
+        "⚡ Start preparing the summary and quiz as soon as a file is uploaded",
+        value=PREFETCH_ON_UPLOAD,
+        help="Processing runs in the background so results are often ready by the time you open a tab"
+    )
+
+    # Identify this browser session for per-session LLM rate limiting
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    session_id = st.session_state.session_id
+    # Background work for this session is cancelled as soon as the session's state is dropped
+    if "prefetch_lease" not in st.session_state:
+        st.session_state.prefetch_lease = PrefetchLease(session_id)
+
+    # Forget results from a previous upload when the file is replaced or removed
+    upload_key = "|".join(
+        getattr(file, "file_id", None) or f"{file.name}-{file.size}" for file in uploaded_files
+    ) if uploaded_files else None
+    if st.session_state.get("upload_key") != upload_key:
+        cancel_prefetch(session_id)
+        for key in ("document_handle", "summary_handle", "quiz_data", "user_answers", "quiz_submitted", "score",
+                    "corpus", "corpus_summary"):
+            st.session_state.pop(key, None)
+        st.session_state.upload_key = upload_key
+
+    if not prefetch_enabled:
+        cancel_prefetch(session_id)
+
+    # With PDFQ_PROFILE_ON_REQUEST set, ?profile=1 in the URL profiles this session's requests
+    # (PDFQ_PROFILE enables it for everyone)
+    profiling = profiling_requested()
 
     if uploaded_file:
         st.info("✅ File uploaded successfully! Let's begin processing.")
 
+        # Kick off speculative processing in the background for a fresh upload
+        job = get_prefetch(session_id, upload_key) if prefetch_enabled else None
+        if prefetch_enabled and job is None and "document_handle" not in st.session_state:
+            # getvalue() returns the upload's buffer itself; the job reads it through its own stream
+            job = start_prefetch(session_id, upload_key, uploaded_file.getvalue())
+            # If every worker is busy, extract inline rather than queue behind other uploads
+            if not job.started.wait(PREFETCH_START_WAIT_SECONDS):
+                cancel_prefetch(session_id)
+                job = None
+
         # Store processed data in session state to preserve it between reruns
         if "quiz_data" not in st.session_state:
             st.session_state.quiz_data = None
-            
-        if "summary_text" not in st.session_state:
-            st.session_state.summary_text = None
+
+        # Sessions keep handles into the shared document store rather than their own copies
+        pdf_document = stored("document_handle")
 
         # Process PDF and extract content
-        if "pdf_content" not in st.session_state:
-            with st.spinner("Reading document content... This may take a moment."):
-                pdf_content, error = extract_text_from_pdf(uploaded_file)
+        if pdf_document is None:
+            with st.spinner("Reading document content... This may take a moment."), profile_request(f"extract-{session_id[:8]}", enabled=profiling):
+                pdf_document = job.result("document") if job else None
+                error = None
+                if pdf_document is None:
+                    pdf_document, error = extract_document_from_pdf(uploaded_file)
                 if error:
                     st.error(error)
-                elif pdf_content:
-                    st.session_state.pdf_content = pdf_content
+                elif pdf_document:
+                    pdf_content = pdf_document.text
+                    st.session_state.document_handle = document_store.put(pdf_document, label=uploaded_file.name)
+                    pdf_document = st.session_state.document_handle.value  # Use the interned copy
+                    preflight = pdf_document.metadata.get("preflight", {})
+                    if preflight.get("policy") == "range":
+                        st.warning(
+                            f"This document has {preflight['page_count']} pages; only the first "
+                            f"{len(preflight['pages'])} pages were processed."
+                        )
+                    elif preflight.get("policy") == "sample":
+                        st.warning(
+                            f"This document has {preflight['page_count']} pages; a representative sample of "
+                            f"{len(preflight['pages'])} pages was processed."
+                        )
+                    normalization = pdf_document.metadata.get("normalization")
+                    if normalization and normalization["tokens_saved"] > 0:
+                        st.caption(
+                            f"Cleaned up headers, footers and whitespace: saved ~{normalization['tokens_saved']:,} "
+                            f"of {normalization['tokens_before']:,} prompt tokens."
+                        )
                     with st.expander("Preview extracted content"):
                         st.text(pdf_content[:500] + "...")
-        
+            if pdf_document is None:
+                return
+
+        summary_text = stored("summary_handle")
+
+        # Release the background job once everything it produced has been used
+        if job and summary_text and st.session_state.quiz_data:
+            cancel_prefetch(session_id)
+
         # Create tabs for different functionalities with nicer styling
         tab1, tab2 = st.tabs([" Summary", " Quiz"]) 
         
@@ -80,15 +257,27 @@ def main():
             st.header("Document Summary")
             
             # Generate Summary button
-            if st.button(" Generate Summary", key="gen_summary") or st.session_state.summary_text: 
+            if st.button(" Generate Summary", key="gen_summary") or summary_text: 
                 # Only process if we don't already have summary data
-                if not st.session_state.summary_text:
-                    with st.spinner("Generating comprehensive document summary... This may take a few minutes."):
-                        summary = generate_summary(st.session_state.pdf_content)
-                        st.session_state.summary_text = summary
+                if not summary_text:
+                    with st.spinner("Generating comprehensive document summary... This may take a few minutes."), profile_request(f"summary-{session_id[:8]}", enabled=profiling):
+                        summary = job.claim("summary") if job else None
+                        if summary is None or is_summary_error(summary):
+                            summary = generate_summary(
+                                pdf_document.text,
+                                session_id=session_id,
+                                document=pdf_document
+                            )
+                        if is_summary_error(summary):
+                            # Not kept, so the button can retry; finished sections are saved and reused
+                            st.error(summary)
+                        else:
+                            summary_text = summary
+                            st.session_state.summary_handle = document_store.put(summary)
                 
                 # Display the summary
-                display_summary(st.session_state.summary_text)
+                if summary_text:
+                    display_summary(summary_text)
 
         with tab2:
             st.header("Interactive Quiz")
@@ -97,17 +286,32 @@ def main():
             if st.button(" Generate Quiz", key="gen_quiz") or st.session_state.quiz_data: 
                 # Only process if we don't already have quiz data
                 if not st.session_state.quiz_data:
-                    with st.spinner("Creating quiz questions... This may take a few minutes."):
-                        st.session_state.quiz_data = generate_quiz(st.session_state.pdf_content)
+                    with st.spinner("Creating quiz questions... This may take a few minutes."), profile_request(f"quiz-{session_id[:8]}", enabled=profiling):
+                        quiz = job.claim("quiz") if job else None
+                        if quiz and "questions" in quiz:
+                            seed_question_bank(pdf_document.text, quiz, session_id)
+                        else:
+                            quiz = generate_quiz_from_bank(pdf_document.text, session_id=session_id)
+                        if "error" in quiz:
+                            # Rejections and failures are not kept, so the button can retry
+                            st.error(quiz["error"])
+                        else:
+                            st.session_state.quiz_data = quiz
                         
-                        # Reset user answers for the new quiz
-                        questions = st.session_state.quiz_data.get("questions", [])
-                        st.session_state.user_answers = [""] * len(questions)
-                        st.session_state.quiz_submitted = False
-                        st.session_state.score = 0
+                            # Reset user answers for the new quiz
+                            questions = st.session_state.quiz_data.get("questions", [])
+                            st.session_state.user_answers = [""] * len(questions)
+                            st.session_state.quiz_submitted = False
+                            st.session_state.score = 0
                 
-                # Always display the quiz if we have data
-                display_interactive_quiz(st.session_state.quiz_data)
+            # Always display the quiz if we have data; missing explanations are written after submission.
+            # They complete the quiz the user already asked for, so they do not count against the rate limit.
+            if st.session_state.quiz_data:
+                display_interactive_quiz(
+                    st.session_state.quiz_data,
+                    explain_answers=lambda questions: generate_explanations(stored("document_handle").text, questions),
+                    explain_wrong_only=QUIZ_EXPLANATIONS == "wrong"
+                )
                 
             # Create new quiz button
             if "quiz_data" in st.session_state and st.session_state.quiz_data:
@@ -118,15 +322,22 @@ def main():
                     st.session_state.user_answers = []  # Reset to empty list first
                     st.session_state.score = 0
                     
-                    # Regenerate quiz
-                    with st.spinner("Generating new quiz questions..."):
-                        st.session_state.quiz_data = generate_quiz(st.session_state.pdf_content)
+                    # Draw a fresh quiz from the document's question bank
+                    with st.spinner("Generating new quiz questions..."), profile_request(f"new-quiz-{session_id[:8]}", enabled=profiling):
+                        quiz = generate_quiz_from_bank(pdf_document.text, session_id=session_id)
+                    if "error" in quiz:
+                        st.error(quiz["error"])
+                    else:
+                        st.session_state.quiz_data = quiz
                         
                         # Initialize user_answers with correct length for new quiz
                         questions = st.session_state.quiz_data.get("questions", [])
                         st.session_state.user_answers = [""] * len(questions)
                         
                         st.rerun()
+
+    elif uploaded_files:
+        corpus_mode(uploaded_files, session_id, profiling)
         
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+"""
+Core pipeline for the PDF Quiz & Summary Generator.
+
+This package extracts text from PDFs and generates summaries and quizzes with
+Ollama. It does not depend on Streamlit, so workers, batch jobs and CLI tools
+can import it directly. Public functions are loaded on first access and heavy
+dependencies (PyPDF2, requests) are only imported when they are actually used.
+"""
+
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    # PDF extraction
+    'extract_document_from_pdf': 'pdf_processor',
+    'extract_text_from_pdf': 'pdf_processor',
+    'preflight_pdf': 'pdf_processor',
+    'get_backend_timings': 'pdf_processor',
+    'Document': 'document',
+    'build_document': 'document',
+
+    # Generation
+    'generate_summary': 'summary_generator',
+    'generate_quiz': 'quiz_generator',
+    'generate_quiz_from_bank': 'question_bank',
+    'call_ollama_api': 'llm_interface',
+    'check_ollama_status': 'llm_interface',
+
+    # Infrastructure
+    'scheduler': 'scheduler',
+    'hedger': 'hedging',
+    'result_store': 'result_store',
+    'document_store': 'document_store',
+    'profile_request': 'profiling',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
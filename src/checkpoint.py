@@ -0,0 +1,78 @@
+import logging
+import threading
+from typing import Any, Callable
+from .result_store import result_store
+from .scheduler import AdmissionRejected, GenerationCancelled
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Checkpoint configuration
+STEP_ATTEMPTS = 2  # Attempts per step before the run fails (on top of call_ollama_api's own retries)
+
+
+class CheckpointError(Exception):
+    """Raised when a step of a checkpointed run fails; completed steps stay saved."""
+
+    def __init__(self, message: str, completed: int, total: int):
+        super().__init__(message)
+        self.completed = completed
+        self.total = total
+
+
+class Checkpoint:
+    """
+    Saved progress of a multi-step generation run
+
+    Each step's output is saved in the shared result store as soon as it
+    completes, keyed by a content-derived step key. The saved outputs are the
+    checkpoint: running the same run again, after a failure or a process
+    restart, skips every step that already has a saved output and only runs
+    the missing ones. Outputs expire with the result store's TTL.
+    """
+
+    def __init__(self, namespace: str, total_steps: int):
+        self.namespace = namespace
+        self.total_steps = total_steps
+        self.completed = 0  # Steps with a saved output in this run
+        self.reused = 0  # Steps whose saved output was used instead of running them
+        self._lock = threading.Lock()
+
+    def run_step(self, step_key: str, step: Callable[[], Any]) -> Any:
+        """
+        Return a step's saved output, or run it and save the output
+
+        Args:
+            step_key: Content-derived key identifying the step's input
+            step: Function producing the step's output; raise ValueError for a
+                bad result that is worth retrying
+
+        Returns:
+            The step's output
+
+        Raises:
+            CheckpointError: If the step keeps failing
+            AdmissionRejected, GenerationCancelled: Passed through unchanged
+        """
+        saved = result_store.get(self.namespace, step_key)
+        if saved is not None:
+            with self._lock:
+                self.completed += 1
+                self.reused += 1
+            return saved
+
+        for attempt in range(STEP_ATTEMPTS):
+            try:
+                output = step()
+                break
+            except (AdmissionRejected, GenerationCancelled):
+                raise
+            except Exception as e:
+                logger.error(f"Step failed (attempt {attempt + 1}/{STEP_ATTEMPTS}): {str(e)}")
+                if attempt == STEP_ATTEMPTS - 1:
+                    raise CheckpointError(str(e), self.completed, self.total_steps) from e
+
+        result_store.put(self.namespace, step_key, output)
+        with self._lock:
+            self.completed += 1
+        return output
@@ -0,0 +1,77 @@
+import logging
+import os
+from typing import List
+from .document import Document, DocumentView, content_hash
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Chunking configuration
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "12000"))  # Upper bound per chunk
+MIN_CHUNK_CHARS = SUMMARY_CHUNK_CHARS // 4  # Content-defined cuts are ignored below this size
+BOUNDARY_MODULUS = 4  # On average every 4th page ends a chunk
+
+
+class Chunk:
+    """A run of whole pages summarized together, identified by its content hash."""
+
+    __slots__ = ("view", "hash")
+
+    def __init__(self, view: DocumentView):
+        self.view = view
+        self.hash = content_hash(str(view))
+
+    @property
+    def text(self) -> str:
+        return str(self.view)
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def __repr__(self) -> str:
+        return f"Chunk(pages {self.view.first_page + 1}-{self.view.last_page + 1}, {self.hash[:8]})"
+
+
+def _is_boundary_page(page_text: str) -> bool:
+    """Decide from the page's own content whether a chunk may end after it."""
+    return int(content_hash(page_text)[:8], 16) % BOUNDARY_MODULUS == 0
+
+
+def chunk_document(document: Document, max_chars: int = SUMMARY_CHUNK_CHARS) -> List[Chunk]:
+    """
+    Split a document into page-aligned chunks with content-defined boundaries
+
+    A chunk ends after a page whose hash marks it as a boundary (once the chunk
+    has reached MIN_CHUNK_CHARS), or before a page that would push it past
+    max_chars. Because boundaries depend on page content rather than running
+    offsets, editing one page usually changes only the chunk containing it and
+    the chunking re-synchronizes at the next boundary page, so unchanged chunks
+    keep their hashes across revisions.
+
+    Args:
+        document: Extracted document
+        max_chars: Soft upper bound for a chunk; a single larger page forms its own chunk
+
+    Returns:
+        Chunks in document order
+    """
+    chunks = []
+    start = None
+    offsets = document.page_offsets
+
+    for page in range(document.page_count):
+        page_start, page_end = offsets[page], offsets[page + 1]
+        if start is not None and page_end - start > max_chars:
+            chunks.append(Chunk(document.view(start, page_start)))
+            start = None
+        if start is None:
+            start = page_start
+
+        if page_end - start >= MIN_CHUNK_CHARS and _is_boundary_page(document.text[page_start:page_end]):
+            chunks.append(Chunk(document.view(start, page_end)))
+            start = None
+
+    if start is not None:
+        chunks.append(Chunk(document.view(start, offsets[-1])))
+
+    return chunks
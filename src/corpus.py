@@ -0,0 +1,383 @@
+import io
+import logging
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+from .document import Document, build_document, content_hash, document_from_payload
+from .document_store import document_store
+from .llm_interface import MODEL_NAME, call_ollama_api
+from .pdf_processor import extract_document_from_pdf
+from .profiling import profiled, propagate_context
+from .question_bank import generate_quiz_from_bank
+from .quiz_generator import generate_explanations
+from .result_store import result_store
+from .scheduler import AdmissionRejected, GenerationCancelled, MAX_CONCURRENT_LLM_CALLS, PRIORITY_INTERACTIVE
+from .summary_generator import generate_summary, is_summary_error
+from .text_normalizer import estimate_tokens
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Corpus configuration
+CORPUS_EXTRACT_WORKERS = int(os.getenv("CORPUS_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+CORPUS_MERGE_FANOUT = int(os.getenv("CORPUS_MERGE_FANOUT", "6"))  # Summaries combined per merge call
+CORPUS_QUIZ_SIZE = 10
+
+# Extraction is CPU-bound pure Python, so it runs in worker processes. They are
+# spawned rather than forked because the Streamlit server is multithreaded.
+_extract_pool: Optional[ProcessPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+
+class Corpus:
+    """
+    A set of documents uploaded together, with pages repeated across them removed
+
+    The documents live in the shared document store; the corpus only holds handles.
+    """
+
+    def __init__(self, documents: List[Document], stats: Dict[str, Any]):
+        self.names = [document.metadata["source"] for document in documents]
+        self._handles = [document_store.put(document, label=name) for document, name in zip(documents, self.names)]
+        self.stats = stats
+
+    @property
+    def documents(self) -> List[Document]:
+        return [handle.value for handle in self._handles]
+
+    def document(self, name: str) -> Optional[Document]:
+        return self._handles[self.names.index(name)].value if name in self.names else None
+
+    @property
+    def text(self) -> str:
+        """All documents as one text, each under its own heading."""
+        # Names come from the corpus: a document interned by another upload may carry a different file name
+        return "\n\n".join(f"# {name}\n\n{document.text}" for name, document in zip(self.names, self.documents))
+
+
+def _extract_file(data: bytes, normalize: bool) -> Tuple[Optional[dict], Optional[str]]:
+    """Worker process entry point: extract one PDF and return its payload."""
+    document, error = extract_document_from_pdf(io.BytesIO(data), normalize=normalize)
+    return (document.to_payload() if document else None), error
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=max(1, CORPUS_EXTRACT_WORKERS), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _extract_pool
+
+
+def _extract_all(files: List[Tuple[str, bytes]], normalize: bool) -> List[Tuple[Optional[dict], Optional[str]]]:
+    global _extract_pool
+    if len(files) > 1 and CORPUS_EXTRACT_WORKERS > 1:
+        try:
+            pool = _get_extract_pool()
+            futures = [pool.submit(_extract_file, data, normalize) for _, data in files]
+            return [future.result() for future in futures]
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Parallel extraction failed, extracting in this process: {str(e)}")
+            with _extract_pool_lock:
+                _extract_pool = None
+    return [_extract_file(data, normalize) for _, data in files]
+
+
+def deduplicate_pages(documents: List[Document]) -> Tuple[List[Document], Dict[str, Any]]:
+    """
+    Remove pages whose text already appeared earlier in the corpus
+
+    Pages are compared by the hash of their whitespace-normalized text, so a
+    syllabus or cover page repeated in every lecture is kept only in the first
+    document that contains it. Documents left with no pages are dropped.
+
+    Args:
+        documents: Extracted documents in corpus order
+
+    Returns:
+        Tuple containing:
+            - Documents with repeated pages removed
+            - Statistics (duplicate_pages, duplicate_documents, tokens_saved)
+    """
+    seen = set()
+    result = []
+    stats = {"duplicate_pages": 0, "duplicate_documents": [], "tokens_saved": 0}
+
+    for document in documents:
+        kept = []
+        for page_text in document.page_texts():
+            key = content_hash(" ".join(page_text.split()))
+            if page_text.strip() and key in seen:
+                stats["duplicate_pages"] += 1
+                stats["tokens_saved"] += estimate_tokens(page_text)
+                continue
+            seen.add(key)
+            kept.append(page_text)
+
+        if not any(page.strip() for page in kept):
+            stats["duplicate_documents"].append(document.metadata["source"])
+        elif len(kept) < document.page_count:
+            metadata = dict(document.metadata, duplicate_pages=document.page_count - len(kept))
+            result.append(build_document(kept, metadata))
+        else:
+            result.append(document)
+
+    return result, stats
+
+
+def extract_corpus(files: List[Tuple[str, bytes]], normalize: bool = True) -> Tuple[Optional[Corpus], List[str]]:
+    """
+    Extract a set of PDFs in parallel and remove pages repeated across them
+
+    Args:
+        files: (file name, raw PDF bytes) pairs
+        normalize: Strip repeated headers/footers and collapse whitespace
+
+    Returns:
+        Tuple containing:
+            - Corpus (or None if no file could be read)
+            - Error messages for files that could not be read
+    """
+    # Sorting by name keeps the corpus, and with it the cache keys, stable across re-uploads
+    files = sorted(files, key=lambda file: file[0])
+    documents, errors = [], []
+    for (name, _), (payload, error) in zip(files, _extract_all(files, normalize)):
+        if error:
+            errors.append(f"{name}: {error}")
+            continue
+        document = document_from_payload(payload)
+        document.metadata["source"] = name
+        documents.append(document)
+
+    if not documents:
+        return None, errors
+
+    documents, stats = deduplicate_pages(documents)
+    stats["pages"] = sum(document.page_count for document in documents)
+    logger.info(
+        f"Corpus of {len(documents)} documents, {stats['pages']} pages; "
+        f"removed {stats['duplicate_pages']} repeated pages"
+    )
+    return Corpus(documents, stats), errors
+
+
+def _map_documents(corpus: Corpus, work) -> List[Any]:
+    """Run work(index, document) for every document, as many at once as the LLM scheduler admits."""
+    with ThreadPoolExecutor(max_workers=max(1, MAX_CONCURRENT_LLM_CALLS), thread_name_prefix="corpus") as pool:
+        documents = corpus.documents
+        return list(pool.map(propagate_context(work), range(len(documents)), documents))
+
+
+@profiled("build_prompt")
+def generate_corpus_merge_prompt(titles: List[str], summaries: List[str]) -> str:
+    """
+    Create the prompt that merges summaries of several documents into one overview.
+    """
+    sections = "\n\n".join(f"### {title}\n{summary}" for title, summary in zip(titles, summaries))
+
+    prompt = f"""
+Task: Below are summaries of related documents, for example the lectures of one course. Combine them into a single overview.
+
+Document summaries:
+{sections}
+
+Instructions:
+1. Start with a short paragraph describing what the documents cover as a whole.
+2. Organize the key concepts by theme rather than by document, noting which documents cover each theme.
+3. Point out how the documents build on each other.
+4. Use headings and bullet points for clarity.
+"""
+    return prompt
+
+
+def _merge_summaries(
+    titles: List[str],
+    summaries: List[str],
+    priority: int,
+    cancel_event: Optional[threading.Event],
+) -> str:
+    """Merge summaries in groups of CORPUS_MERGE_FANOUT, level by level, until one remains."""
+    while len(summaries) > 1:
+        merged_titles, merged_summaries = [], []
+        for start in range(0, len(summaries), CORPUS_MERGE_FANOUT):
+            group_titles = titles[start:start + CORPUS_MERGE_FANOUT]
+            group_summaries = summaries[start:start + CORPUS_MERGE_FANOUT]
+            if len(group_summaries) == 1:
+                merged_titles.append(group_titles[0])
+                merged_summaries.append(group_summaries[0])
+                continue
+
+            cache_key = f"{MODEL_NAME}:{content_hash(''.join(group_titles + group_summaries))}"
+            merged = result_store.get("corpus_summary", cache_key)
+            if merged is None:
+                prompt = generate_corpus_merge_prompt(group_titles, group_summaries)
+                response = call_ollama_api(prompt, priority=priority, cancel_event=cancel_event)
+                if 'response' not in response:
+                    raise ValueError("Invalid response from language model")
+                merged = response['response']
+                result_store.put("corpus_summary", cache_key, merged)
+
+            merged_titles.append(f"{group_titles[0]} – {group_titles[-1]}")
+            merged_summaries.append(merged)
+        titles, summaries = merged_titles, merged_summaries
+    return summaries[0]
+
+
+def generate_corpus_summary(
+    corpus: Corpus,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Summarize every document of a corpus and merge the summaries into an overview
+
+    Each document is summarized on its own, so its summary is cached
+    independently of the rest of the corpus and reused when the corpus changes.
+    The summaries are then merged hierarchically, CORPUS_MERGE_FANOUT at a time.
+
+    Args:
+        corpus: Extracted corpus
+        session_id: Identifier of the calling session; only the first document's
+            call counts towards the session's rate limit
+        priority: Scheduler priority class for the LLM calls
+        cancel_event: Event that abandons generation when set
+
+    Returns:
+        Dictionary with the merged "summary" and per-document "documents"
+        entries (name and summary), or an "error" message
+    """
+    def summarize(index: int, document: Document) -> str:
+        return generate_summary(
+            document.text,
+            session_id=session_id if index == 0 else None,
+            priority=priority,
+            cancel_event=cancel_event,
+            document=document
+        )
+
+    summaries = _map_documents(corpus, summarize)
+    for name, summary in zip(corpus.names, summaries):
+        if is_summary_error(summary):
+            return {"error": f"{name}: {summary}"}
+
+    documents = [{"name": name, "summary": summary} for name, summary in zip(corpus.names, summaries)]
+    try:
+        overview = _merge_summaries(corpus.names, summaries, priority, cancel_event)
+        return {"summary": overview, "documents": documents}
+    except AdmissionRejected as e:
+        logger.warning(f"Corpus summary request rejected: {str(e)}")
+        return {"error": str(e)}
+    except GenerationCancelled:
+        logger.info("Corpus summary generation cancelled")
+        return {"error": "Summary generation was cancelled."}
+    except Exception as e:
+        logger.error(f"Corpus summary error: {str(e)}")
+        return {"error": f"Failed to combine document summaries: {str(e)}"}
+
+
+def generate_corpus_quiz(
+    corpus: Corpus,
+    session_id: Optional[str] = None,
+    num_questions: int = CORPUS_QUIZ_SIZE,
+    priority: int = PRIORITY_INTERACTIVE,
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Build one quiz covering every document of a corpus
+
+    The questions are shared out across the documents in turn, starting at a
+    random document, and each document's share is drawn from its question
+    bank. A session therefore gets questions it has not seen yet every time,
+    and the banks are reused by single-document sessions with the same file.
+    Each question records the document it came from under "source".
+
+    Args:
+        corpus: Extracted corpus
+        session_id: Identifier of the calling session; only the first document's
+            call counts towards the session's rate limit
+        num_questions: Number of questions in the combined quiz
+        priority: Scheduler priority class for the LLM calls
+        cancel_event: Event that abandons generation when set
+
+    Returns:
+        Dictionary containing quiz data (questions, options, answers), or an
+        "error" message if no document produced questions
+    """
+    # Share out the questions in turn; with more documents than questions, the
+    # random start spreads coverage over repeated quizzes
+    count = len(corpus.names)
+    start = random.randrange(count)
+    shares = [0] * count
+    for offset in range(num_questions):
+        shares[(start + offset) % count] += 1
+
+    def quiz_for(index: int, document: Document) -> Dict[str, Any]:
+        if not shares[index]:
+            return {"questions": []}
+        return generate_quiz_from_bank(
+            document.text,
+            session_id=session_id,
+            num_questions=shares[index],
+            priority=priority,
+            cancel_event=cancel_event,
+            rate_limited=index == start
+        )
+
+    quizzes = _map_documents(corpus, quiz_for)
+    questions, errors = [], []
+    for name, quiz in zip(corpus.names, quizzes):
+        if "error" in quiz:
+            errors.append(f"{name}: {quiz['error']}")
+            continue
+        questions.extend(dict(question, source=name) for question in quiz["questions"])
+
+    if not questions:
+        return {"error": errors[0] if errors else "No valid questions generated"}
+
+    quiz = {"questions": questions}
+    if errors:
+        quiz["warnings"] = errors
+    return quiz
+
+
+def explain_corpus_answers(
+    corpus: Corpus,
+    questions: List[Dict[str, Any]],
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Explain corpus quiz answers, grounding each question in its source document
+
+    Args:
+        corpus: Extracted corpus
+        questions: Questions to explain, each with a "source" document name
+        session_id: Identifier of the calling session
+
+    Returns:
+        Dictionary with an "explanations" list aligned with questions, or an
+        "error" message
+    """
+    explanations = [""] * len(questions)
+    by_source: Dict[str, List[int]] = {}
+    for index, question in enumerate(questions):
+        by_source.setdefault(question.get("source"), []).append(index)
+
+    for position, (source, indices) in enumerate(by_source.items()):
+        document = corpus.document(source)
+        text = document.text if document is not None else corpus.text
+        result = generate_explanations(
+            text, [questions[i] for i in indices], session_id=session_id if position == 0 else None
+        )
+        if "error" in result:
+            return result
+        for index, explanation in zip(indices, result["explanations"]):
+            explanations[index] = explanation
+
+    return {"explanations": explanations}
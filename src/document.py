@@ -0,0 +1,288 @@
+import bisect
+import hashlib
+import logging
+import re
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Block kinds
+BLOCK_HEADING = "heading"
+BLOCK_PARAGRAPH = "paragraph"
+
+# Heading detection thresholds
+MAX_HEADING_CHARS = 80
+MAX_HEADING_WORDS = 10
+
+NUMBERED_HEADING_RE = re.compile(r'^(\d+(?:\.\d+)*)[.)]?\s+[A-Z]')
+TRAILING_PUNCTUATION = ('.', ',', ';', ':', '?', '!')
+
+
+class Block:
+    """A heading or paragraph, stored as character offsets into Document.text."""
+
+    __slots__ = ("kind", "page", "start", "end", "level")
+
+    def __init__(self, kind: str, page: int, start: int, end: int, level: int = 0):
+        self.kind = kind
+        self.page = page
+        self.start = start
+        self.end = end
+        self.level = level
+
+    def __repr__(self) -> str:
+        return f"Block({self.kind!r}, page={self.page}, start={self.start}, end={self.end}, level={self.level})"
+
+
+class DocumentView:
+    """
+    A lazy slice of a Document
+
+    Holds only the document reference and two offsets; the text is copied out
+    of the document only when the view is converted with str().
+    """
+
+    __slots__ = ("document", "start", "end")
+
+    def __init__(self, document: "Document", start: int, end: int):
+        self.document = document
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __str__(self) -> str:
+        return self.document.text[self.start:self.end]
+
+    @property
+    def first_page(self) -> int:
+        return self.document.page_of(self.start)
+
+    @property
+    def last_page(self) -> int:
+        return self.document.page_of(max(self.start, self.end - 1))
+
+    def __repr__(self) -> str:
+        return f"DocumentView(start={self.start}, end={self.end})"
+
+
+class Document:
+    """
+    Structured representation of an extracted PDF
+
+    The full text is kept once as a single string; pages and blocks are
+    described by character offsets so they can be sliced without re-splitting.
+    Blocks are only detected when first used, so rebuilding a document from
+    a cached payload stays cheap.
+    """
+
+    __slots__ = ("text", "page_offsets", "_blocks", "metadata")
+
+    def __init__(self, text: str, page_offsets: array, blocks: Optional[List[Block]] = None,
+                 metadata: Optional[dict] = None):
+        self.text = text
+        self.page_offsets = page_offsets
+        self._blocks = blocks
+        self.metadata = metadata if metadata is not None else {}
+
+    @property
+    def blocks(self) -> List[Block]:
+        """Heading and paragraph blocks, detected on first access."""
+        if self._blocks is None:
+            self._blocks = detect_blocks(self.page_texts())
+        return self._blocks
+
+    @property
+    def blocks_loaded(self) -> bool:
+        return self._blocks is not None
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets) - 1
+
+    def page_view(self, page: int) -> DocumentView:
+        """Return a view over a single page (0-based)."""
+        return DocumentView(self, self.page_offsets[page], self.page_offsets[page + 1])
+
+    def page_text(self, page: int) -> str:
+        """Return the text of a single page (0-based)."""
+        return str(self.page_view(page))
+
+    def page_texts(self) -> List[str]:
+        """Return the text of every page without the newline that joins them."""
+        return [self.text[self.page_offsets[i]:self.page_offsets[i + 1] - 1] for i in range(self.page_count)]
+
+    def to_payload(self) -> dict:
+        """Return a JSON-serializable form of the document (see document_from_payload)."""
+        return {"pages": self.page_texts(), "metadata": self.metadata}
+
+    def view(self, start: int, end: int) -> DocumentView:
+        """Return a view over an arbitrary character range."""
+        return DocumentView(self, start, end)
+
+    def page_of(self, offset: int) -> int:
+        """Return the 0-based page containing a character offset."""
+        return min(max(0, bisect.bisect_right(self.page_offsets, offset) - 1), max(0, self.page_count - 1))
+
+    def block_text(self, block: Block) -> str:
+        return self.text[block.start:block.end]
+
+    def headings(self) -> List[Block]:
+        return [block for block in self.blocks if block.kind == BLOCK_HEADING]
+
+    def sections(self) -> Iterator[Tuple[Optional[Block], DocumentView]]:
+        """
+        Iterate over sections delimited by headings
+
+        Yields:
+            Tuples of (heading block or None for leading text, view over the section body)
+        """
+        headings = self.headings()
+        if not headings or headings[0].start > 0:
+            end = headings[0].start if headings else len(self.text)
+            if self.text[:end].strip():
+                yield None, DocumentView(self, 0, end)
+
+        for i, heading in enumerate(headings):
+            end = headings[i + 1].start if i + 1 < len(headings) else len(self.text)
+            yield heading, DocumentView(self, heading.end, end)
+
+
+def content_hash(text: str) -> str:
+    """Return a stable hash of a piece of text, used as a cache key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _is_title_case(words: List[str]) -> bool:
+    """Return True if most significant words are capitalized, as in a slide or section title."""
+    significant = [word for word in words if len(word) > 3 and word[0].isalpha()]
+    if not significant:
+        return words[0][0].isupper()
+    return sum(1 for word in significant if word[0].isupper()) * 2 >= len(significant)
+
+
+def heading_level(line: str, first_on_page: bool = False) -> int:
+    """
+    Guess whether a line is a heading
+
+    Args:
+        line: A single stripped line of text
+        first_on_page: Whether this line starts a page that does not continue a
+            sentence from the previous page
+
+    Returns:
+        Heading level (1 = top level), or 0 if the line looks like body text
+    """
+    if not line or len(line) > MAX_HEADING_CHARS or line.endswith(TRAILING_PUNCTUATION):
+        return 0
+
+    words = line.split()
+    if len(words) > MAX_HEADING_WORDS:
+        return 0
+
+    numbered = NUMBERED_HEADING_RE.match(line)
+    if numbered:
+        return numbered.group(1).count(".") + 1
+
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return 1
+
+    # Slide decks usually start every page with a short title
+    if first_on_page and len(letters) >= 3 and _is_title_case(words):
+        return 2
+
+    return 0
+
+
+def _ends_sentence(page: str) -> bool:
+    """Return True unless the page's last line runs on into the next page."""
+    lines = [line.strip() for line in page.split("\n") if line.strip()]
+    return not lines or lines[-1].endswith(('.', '?', '!', ':')) or bool(heading_level(lines[-1]))
+
+
+def detect_blocks(pages: List[str]) -> List[Block]:
+    """
+    Split pages into heading and paragraph blocks
+
+    Args:
+        pages: Text of each page, as joined by build_document
+
+    Returns:
+        Blocks in document order, with offsets into the joined text
+    """
+    blocks: List[Block] = []
+    offset = 0
+    previous_page_ends_sentence = True
+
+    for page_number, page in enumerate(pages):
+        page_start = offset
+        paragraph_start = None
+        paragraph_end = None
+        first_line = True
+
+        line_start = 0
+        for line in page.split("\n"):
+            line_end = line_start + len(line)
+            stripped = line.strip()
+
+            if not stripped:
+                if paragraph_start is not None:
+                    blocks.append(Block(BLOCK_PARAGRAPH, page_number, paragraph_start, paragraph_end))
+                    paragraph_start = None
+            else:
+                level = heading_level(stripped, first_on_page=first_line and previous_page_ends_sentence)
+                first_line = False
+                start = page_start + line_start + (len(line) - len(line.lstrip()))
+                end = page_start + line_start + len(line.rstrip())
+                if level:
+                    if paragraph_start is not None:
+                        blocks.append(Block(BLOCK_PARAGRAPH, page_number, paragraph_start, paragraph_end))
+                        paragraph_start = None
+                    blocks.append(Block(BLOCK_HEADING, page_number, start, end, level))
+                else:
+                    if paragraph_start is None:
+                        paragraph_start = start
+                    paragraph_end = end
+
+            line_start = line_end + 1
+
+        if paragraph_start is not None:
+            blocks.append(Block(BLOCK_PARAGRAPH, page_number, paragraph_start, paragraph_end))
+
+        previous_page_ends_sentence = _ends_sentence(page)
+        offset += len(page) + 1
+
+    return blocks
+
+
+def build_document(pages: List[str], metadata: Optional[dict] = None) -> Document:
+    """
+    Build a Document from per-page text
+
+    Pages are joined with a trailing newline each, matching the flat text the
+    extractor has always produced. Heading/paragraph blocks are detected
+    lazily on first use (see detect_blocks).
+
+    Args:
+        pages: Extracted text for each page, in order
+        metadata: Extra information about the extraction (timings, statistics)
+
+    Returns:
+        Document with page offsets
+    """
+    page_offsets = array("L", [0])
+    offset = 0
+    for page in pages:
+        offset += len(page) + 1
+        page_offsets.append(offset)
+
+    return Document("".join(page + "\n" for page in pages), page_offsets, metadata=metadata)
+
+
+def document_from_payload(payload: dict) -> Document:
+    """Rebuild a Document from the output of Document.to_payload."""
+    return build_document(payload["pages"], payload.get("metadata"))
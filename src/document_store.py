@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+import zlib
+from typing import Any, Dict, List, Optional
+from .document import Document, content_hash, document_from_payload
+from .result_store import result_store
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Document store configuration
+DOCUMENT_STORE_MAX_MB = float(os.getenv("DOCUMENT_STORE_MAX_MB", "256"))
+DOCUMENT_STORE_COMPRESS = os.getenv("DOCUMENT_STORE_COMPRESS", "1").lower() in ("1", "true", "yes")
+COMPRESSION_LEVEL = 6
+BLOCK_BYTES = 72  # Approximate size of one Block instance
+LOW_WATER_RATIO = 0.8  # Once over budget, shrink to this share of it so the next put does not shrink again
+
+# Entry tiers, from fastest to cheapest
+TIER_HOT = "hot"
+TIER_COMPRESSED = "compressed"
+TIER_SPILLED = "spilled"
+
+
+def _kind_of(value: Any) -> str:
+    if isinstance(value, Document):
+        return "document"
+    if isinstance(value, str):
+        return "text"
+    return "json"
+
+
+def _to_payload(kind: str, value: Any) -> Any:
+    return value.to_payload() if kind == "document" else value
+
+
+def _from_payload(kind: str, payload: Any) -> Any:
+    return document_from_payload(payload) if kind == "document" else payload
+
+
+def document_key(text: str) -> str:
+    """Return the store key of the document with this text."""
+    return f"document:{content_hash(text)}"
+
+
+def _key_of(kind: str, value: Any) -> str:
+    if kind == "document":
+        # Only the text identifies a document; metadata such as extraction timing or a
+        # corpus file name differs between uploads of the same file
+        return document_key(value.text)
+    if kind == "text":
+        return f"text:{content_hash(value)}"
+    return f"json:{content_hash(json.dumps(value, sort_keys=True))}"
+
+
+def _size_of(kind: str, value: Any) -> int:
+    """Approximate bytes a live value keeps in memory."""
+    if kind == "document":
+        return (sys.getsizeof(value.text) + value.page_offsets.itemsize * len(value.page_offsets)
+                + (BLOCK_BYTES * len(value.blocks) if value.blocks_loaded else 0))
+    if kind == "text":
+        return sys.getsizeof(value)
+    return 2 * len(json.dumps(value))
+
+
+class _Entry:
+    """One interned payload and the sessions referencing it."""
+
+    __slots__ = ("kind", "value", "blob", "size", "refs", "last_used", "label")
+
+    def __init__(self, kind: str, value: Any, label: Optional[str]):
+        self.kind = kind
+        self.value = value  # Live object while hot
+        self.blob: Optional[bytes] = None  # zlib-compressed JSON payload while compressed
+        self.size = _size_of(kind, value)
+        self.refs = 0
+        self.last_used = time.monotonic()
+        self.label = label
+
+    @property
+    def tier(self) -> str:
+        if self.value is not None:
+            return TIER_HOT
+        return TIER_COMPRESSED if self.blob is not None else TIER_SPILLED
+
+    @property
+    def bytes_held(self) -> int:
+        if self.value is not None:
+            return self.size
+        return len(self.blob) if self.blob is not None else 0
+
+
+class DocumentHandle:
+    """
+    A session's reference to a payload in the document store
+
+    Sessions keep the handle instead of the payload. The reference is
+    released automatically when the handle is garbage collected, e.g. when
+    the session ends or drops the upload.
+    """
+
+    __slots__ = ("key", "_store", "__weakref__")
+
+    def __init__(self, store: "DocumentStore", key: str):
+        self.key = key
+        self._store = store
+        store._acquire(key)
+        weakref.finalize(self, store._release, key)
+
+    @property
+    def value(self) -> Any:
+        """The payload, or None if it was evicted and can no longer be restored."""
+        return self._store.get(self.key)
+
+    def __repr__(self) -> str:
+        return f"DocumentHandle({self.key[:20]})"
+
+
+class DocumentStore:
+    """
+    Process-wide, reference-counted store for documents and generated results
+
+    Identical payloads put by different sessions are interned: the store
+    keeps one copy and hands out handles to it. When the memory held exceeds
+    the budget, unreferenced payloads are dropped first (least recently used
+    first), then referenced ones are compressed and finally spilled to the
+    shared result store on disk, from where they are restored on access.
+    """
+
+    def __init__(self, max_bytes: int = int(DOCUMENT_STORE_MAX_MB * 1024 * 1024),
+                 compress: bool = DOCUMENT_STORE_COMPRESS):
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self._stats = {"puts": 0, "dedup_hits": 0, "evictions": 0, "compressions": 0, "spills": 0, "restores": 0}
+
+    def put(self, value: Any, label: Optional[str] = None) -> DocumentHandle:
+        """
+        Intern a payload and return a handle to it
+
+        Args:
+            value: Document, text or JSON-serializable value
+            label: Human-readable name shown in the metrics (e.g. the file name)
+
+        Returns:
+            Handle that keeps the payload referenced while it is alive
+        """
+        kind = _kind_of(value)
+        key = _key_of(kind, value)
+        with self._lock:
+            self._stats["puts"] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(kind, value, label)
+            else:
+                self._stats["dedup_hits"] += 1
+                if entry.value is None:
+                    # The caller's copy is as good as a decompressed one
+                    entry.value, entry.blob = value, None
+                entry.label = entry.label or label
+            entry.last_used = time.monotonic()
+            handle = DocumentHandle(self, key)
+            self._enforce_budget(keep=key)
+        return handle
+
+    def acquire(self, key: str) -> Optional[DocumentHandle]:
+        """Return a new handle to a payload already in the store, or None if it is not there."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            return DocumentHandle(self, key)
+
+    def get(self, key: str) -> Any:
+        """Return the payload for a key, restoring it if it was compressed or spilled."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.last_used = time.monotonic()
+            if entry.value is not None:
+                return entry.value
+
+            if entry.blob is not None:
+                payload = json.loads(zlib.decompress(entry.blob).decode("utf-8"))
+            else:
+                payload = result_store.get("document_store", key)
+                if payload is None:
+                    logger.error(f"Spilled payload {key[:20]} is no longer available")
+                    return None
+            entry.value, entry.blob = _from_payload(entry.kind, payload), None
+            self._stats["restores"] += 1
+            self._enforce_budget(keep=key)
+            return entry.value
+
+    def _acquire(self, key: str):
+        with self._lock:
+            self._entries[key].refs += 1
+
+    def _release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs -= 1
+
+    def bytes_held(self) -> int:
+        with self._lock:
+            return sum(entry.bytes_held for entry in self._entries.values())
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        """Shrink the store to its low-water mark once over max_bytes; the entry being accessed (keep) stays hot."""
+        held = self.bytes_held()
+        if held <= self.max_bytes:
+            return
+        target = int(self.max_bytes * LOW_WATER_RATIO)
+
+        by_age = sorted(self._entries.items(), key=lambda item: item[1].last_used)
+        for key, entry in by_age:
+            if held <= target:
+                return
+            if entry.refs <= 0 and key != keep:
+                held -= entry.bytes_held
+                del self._entries[key]
+                self._stats["evictions"] += 1
+
+        for key, entry in by_age:
+            if held <= target:
+                return
+            if key == keep or key not in self._entries or entry.value is None:
+                continue
+            payload = _to_payload(entry.kind, entry.value)
+            if self.compress:
+                entry.blob = zlib.compress(json.dumps(payload).encode("utf-8"), COMPRESSION_LEVEL)
+                held -= entry.size - len(entry.blob)
+                self._stats["compressions"] += 1
+            elif result_store.enabled:
+                result_store.put("document_store", key, payload)
+                held -= entry.size
+                self._stats["spills"] += 1
+            else:
+                continue
+            entry.value = None
+
+        if self.compress and result_store.enabled:
+            for key, entry in by_age:
+                if held <= target:
+                    return
+                if key == keep or key not in self._entries or entry.blob is None:
+                    continue
+                result_store.put("document_store", key, json.loads(zlib.decompress(entry.blob).decode("utf-8")))
+                held -= len(entry.blob)
+                entry.blob = None
+                self._stats["spills"] += 1
+
+        if held > self.max_bytes:
+            logger.warning(f"Document store holds {held:,} bytes, above its {self.max_bytes:,} byte budget")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and the bytes held per tier."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries),
+                         referenced=sum(1 for entry in self._entries.values() if entry.refs > 0))
+            for tier in (TIER_HOT, TIER_COMPRESSED, TIER_SPILLED):
+                stats[f"{tier}_entries"] = sum(1 for entry in self._entries.values() if entry.tier == tier)
+            stats["bytes_held"] = sum(entry.bytes_held for entry in self._entries.values())
+            stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Return per-payload metrics (bytes held, references, tier), largest first."""
+        with self._lock:
+            rows = [
+                {"key": key, "label": entry.label, "kind": entry.kind, "tier": entry.tier,
+                 "bytes_held": entry.bytes_held, "size": entry.size, "refs": entry.refs}
+                for key, entry in self._entries.items()
+            ]
+        return sorted(rows, key=lambda row: row["bytes_held"], reverse=True)
+
+
+# Process-wide store shared by every Streamlit session
+document_store = DocumentStore()
@@ -0,0 +1,248 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from .scheduler import CANCEL_POLL_SECONDS, GenerationCancelled
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Request hedging configuration
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # First-token percentile used as the deadline
+HEDGE_INITIAL_DELAY = float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "15"))  # Deadline until enough samples exist
+HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))  # Share of calls that may be duplicated
+HEDGE_MIN_DELAY = 0.5
+HEDGE_MIN_SAMPLES = 20
+FIRST_TOKEN_SAMPLES = 200  # Per prompt-size class
+STREAM_TIMEOUT = (10, 300)  # Connect and between-chunk read timeouts in seconds
+STATS_LOG_INTERVAL_SECONDS = 300  # How often the hedging counters are logged
+
+
+class _StreamAttempt:
+    """One streaming generate request to one backend, run on its own thread."""
+
+    def __init__(self, url: str, payload: Dict[str, Any], finished: threading.Event, hedge: bool):
+        self.url = url
+        self.payload = payload
+        self.hedge = hedge
+        self.finished = finished
+        self.first_token = threading.Event()
+        self.first_token_seconds: Optional[float] = None
+        self.started = time.monotonic()
+        self.done = False
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Exception] = None
+        self._cancelled = threading.Event()
+        self._response = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        """Stop reading and close the connection, which makes Ollama abort the generation."""
+        self._cancelled.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        import requests
+
+        try:
+            self._response = requests.post(self.url, json=dict(self.payload, stream=True),
+                                           stream=True, timeout=STREAM_TIMEOUT)
+            self._response.raise_for_status()
+            parts: List[str] = []
+            final: Dict[str, Any] = {}
+            for line in self._response.iter_lines():
+                if self._cancelled.is_set():
+                    return
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise requests.RequestException(f"Ollama error: {chunk['error']}")
+                if not self.first_token.is_set():
+                    self.first_token_seconds = time.monotonic() - self.started
+                    self.first_token.set()
+                parts.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    final = chunk
+                    break
+            if self._cancelled.is_set():
+                return
+            if not final:
+                raise requests.RequestException("Stream ended before generation was done")
+            self.result = dict(final, response="".join(parts))
+        except Exception as e:
+            # Closing the response from another thread surfaces here as an arbitrary read error
+            if not self._cancelled.is_set():
+                self.error = e if isinstance(e, requests.RequestException) else requests.RequestException(str(e))
+        finally:
+            if self._response is not None:
+                self._response.close()
+            self.done = True
+            self.finished.set()
+
+
+class RequestHedger:
+    """
+    Duplicates slow LLM calls to another backend to cut tail latency
+
+    A call is streamed from the primary backend. If its first token has not
+    arrived by the deadline, the call is sent again to the next alternate
+    backend, the first complete response wins and the other request is
+    cancelled. The deadline is a high percentile of recently observed
+    first-token times for prompts of similar size, and only a bounded share
+    of calls is ever duplicated, so the extra load stays small.
+    """
+
+    def __init__(
+        self,
+        percentile: float = HEDGE_PERCENTILE,
+        initial_delay: float = HEDGE_INITIAL_DELAY,
+        max_rate: float = HEDGE_MAX_RATE,
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.max_rate = max_rate
+        self._lock = threading.Lock()
+        self._first_tokens: Dict[int, deque] = {}
+        self._next_backend = itertools.count()
+        self._stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "budget_exhausted": 0, "errors": 0}
+        self._last_stats_log = time.monotonic()
+
+    @staticmethod
+    def _size_class(payload: Dict[str, Any]) -> int:
+        # Prompt evaluation dominates time to first token, so compare prompts of similar length
+        return len(payload.get("prompt", "")).bit_length()
+
+    def deadline(self, payload: Dict[str, Any]) -> float:
+        """Seconds to wait for the first token before hedging a call with this payload."""
+        with self._lock:
+            samples = sorted(self._first_tokens.get(self._size_class(payload), ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return self.initial_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(HEDGE_MIN_DELAY, samples[index])
+
+    def _record_first_token(self, payload: Dict[str, Any], seconds: float):
+        with self._lock:
+            size_class = self._size_class(payload)
+            if size_class not in self._first_tokens:
+                self._first_tokens[size_class] = deque(maxlen=FIRST_TOKEN_SAMPLES)
+            self._first_tokens[size_class].append(seconds)
+
+    def _acquire_hedge(self) -> bool:
+        with self._lock:
+            if self._stats["hedged"] + 1 > max(1.0, self.max_rate * self._stats["calls"]):
+                self._stats["budget_exhausted"] += 1
+                return False
+            self._stats["hedged"] += 1
+            return True
+
+    def generate(
+        self,
+        primary_url: str,
+        alternate_urls: List[str],
+        payload: Dict[str, Any],
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a generate request, hedging it to an alternate backend if it is slow to start
+
+        Args:
+            primary_url: Generate endpoint of the primary backend
+            alternate_urls: Generate endpoints that may receive the duplicate
+            payload: Ollama generate request body
+            cancel_event: Event that cancels every outstanding request when set
+
+        Returns:
+            The winning response, with the streamed text joined under "response"
+
+        Raises:
+            GenerationCancelled: If cancel_event is set before a response completes
+            requests.RequestException: If every attempt failed (the first error is raised)
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+
+        finished = threading.Event()
+        primary = _StreamAttempt(primary_url, payload, finished, hedge=False)
+        primary.start()
+        attempts = [primary]
+        hedge_at = time.monotonic() + self.deadline(payload) if alternate_urls else float("inf")
+        winner = None
+
+        try:
+            while winner is None:
+                finished.clear()
+                winner = next((attempt for attempt in attempts if attempt.result is not None), None)
+                if winner is not None:
+                    break
+                if all(attempt.done for attempt in attempts):
+                    with self._lock:
+                        self._stats["errors"] += 1
+                    raise next(attempt.error for attempt in attempts if attempt.error is not None)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled("LLM call cancelled")
+
+                now = time.monotonic()
+                if len(attempts) == 1 and now >= hedge_at:
+                    hedge_at = float("inf")
+                    if not primary.first_token.is_set() and self._acquire_hedge():
+                        url = alternate_urls[next(self._next_backend) % len(alternate_urls)]
+                        logger.info(f"No first token after {now - primary.started:.1f}s, hedging call to {url}")
+                        hedge = _StreamAttempt(url, payload, finished, hedge=True)
+                        hedge.start()
+                        attempts.append(hedge)
+
+                finished.wait(max(0.0, min(CANCEL_POLL_SECONDS, hedge_at - now)))
+        finally:
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+            if primary.first_token_seconds is not None:
+                self._record_first_token(payload, primary.first_token_seconds)
+            elif winner is not None:
+                # The primary lost before its first token; its wait so far is a lower bound worth keeping
+                self._record_first_token(payload, time.monotonic() - primary.started)
+            self._log_stats_if_due()
+
+        if winner.hedge:
+            with self._lock:
+                self._stats["hedge_wins"] += 1
+        return winner.result
+
+    def _log_stats_if_due(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_stats_log < STATS_LOG_INTERVAL_SECONDS:
+                return
+            self._last_stats_log = now
+        stats = self.stats()
+        logger.info(
+            f"Hedged {stats['hedged']}/{stats['calls']} calls ({stats['hedge_rate']:.1%}), "
+            f"duplicate won {stats['hedge_win_rate']:.0%}, budget exhausted {stats['budget_exhausted']}x, "
+            f"{stats['errors']} failed"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hedging counters, hedge rate and how often the duplicate won."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hedge_rate"] = stats["hedged"] / stats["calls"] if stats["calls"] else 0.0
+        stats["hedge_win_rate"] = stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
+        return stats
+
+
+# Process-wide hedger; its first-token statistics are shared by every session
+hedger = RequestHedger()
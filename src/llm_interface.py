@@ -1,30 +1,51 @@
-import requests
 import json
+import os
 import re
 import logging
+import threading
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from .hedging import hedger
+from .profiling import profiled
+from .scheduler import scheduler, GenerationCancelled, PRIORITY_INTERACTIVE
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Module logger (configured by the application entry point)
 logger = logging.getLogger(__name__)
 
 # Ollama API configuration
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+OLLAMA_API_URL = f"{OLLAMA_HOST}/api/generate"
+OLLAMA_TAGS_URL = f"{OLLAMA_HOST}/api/tags"
+# Alternate Ollama servers that slow calls may be duplicated to (hedging is off when empty)
+OLLAMA_HEDGE_HOSTS = [host.strip().rstrip("/") for host in os.getenv("OLLAMA_HEDGE_HOSTS", "").split(",") if host.strip()]
+OLLAMA_HEDGE_API_URLS = [f"{host}/api/generate" for host in OLLAMA_HEDGE_HOSTS]
 MODEL_NAME = "llama3:latest"  
 
-def call_ollama_api(prompt: str, max_retries: int = 3) -> Dict[str, Any]:
+@profiled("call_ollama_api")
+def call_ollama_api(
+    prompt: str,
+    max_retries: int = 3,
+    priority: int = PRIORITY_INTERACTIVE,
+    session_id: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
     """
     Call the Ollama API with retry logic
     
     Args:
         prompt: The text prompt to send to the model
         max_retries: Maximum number of retry attempts
+        priority: Scheduler priority class (interactive or batch)
+        session_id: Identifier of the calling session, used for rate limiting
+        cancel_event: Event that abandons the call while it is queued or between retries
+            (and mid-generation when hedging is enabled)
         
     Returns:
         JSON response from Ollama API
         
     Raises:
+        AdmissionRejected: If the scheduler refuses the call under load
+        GenerationCancelled: If cancel_event is set before the call completes
         Exception: If all retry attempts fail
     """
     payload = {
@@ -35,18 +56,48 @@ def call_ollama_api(prompt: str, max_retries: int = 3) -> Dict[str, Any]:
         "system": "You are a helpful assistant that creates high-quality educational content."
     }
 
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(OLLAMA_API_URL, json=payload)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logger.error(f"Request failed (attempt {attempt+1}/{max_retries}): {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            else:
-                raise
+    import requests  # Imported lazily to keep worker and CLI start-up fast
+
+    with scheduler.slot(priority=priority, session_id=session_id, cancel_event=cancel_event):
+        for attempt in range(max_retries):
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled("LLM call cancelled")
+            try:
+                if OLLAMA_HEDGE_API_URLS:
+                    return hedger.generate(OLLAMA_API_URL, OLLAMA_HEDGE_API_URLS, payload, cancel_event)
+                response = requests.post(OLLAMA_API_URL, json=payload)
+                response.raise_for_status()
+                return response.json()
+            except requests.RequestException as e:
+                logger.error(f"Request failed (attempt {attempt+1}/{max_retries}): {str(e)}")
+                if attempt < max_retries - 1:
+                    time.sleep(2)
+                else:
+                    raise
+
+def check_ollama_status(timeout: float = 5) -> Tuple[bool, List[str]]:
+    """
+    Check whether Ollama is reachable and which models it has
+    
+    Args:
+        timeout: Seconds to wait for the API before reporting it as unreachable
+        
+    Returns:
+        Tuple containing:
+            - Whether the API responded
+            - Names of the available models
+    """
+    import requests
+
+    try:
+        response = requests.get(OLLAMA_TAGS_URL, timeout=timeout)
+        response.raise_for_status()
+        return True, [model["name"] for model in response.json().get("models", [])]
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Ollama status check failed: {str(e)}")
+        return False, []
 
+@profiled("extract_json_from_text")
 def extract_json_from_text(text: str) -> Dict[str, Any]:
     """
     Extract JSON from text that may contain additional formatting
@@ -85,7 +136,7 @@ def extract_json_from_text(text: str) -> Dict[str, Any]:
 
             questions = []
             q_blocks = re.findall(
-                r'question["\s:]+([^"]+)["\s,]+options["\s:]+\[(.*?)\]["\s,]+correctAnswer["\s:]+["]([^"]+)["\s,]+explanation["\s:]+["]([^"]+)',
+                r'question["\s:]+([^"]+)["\s,]+options["\s:]+\[(.*?)\]["\s,]+correctAnswer["\s:]+["]([^"]+)(?:["\s,]+explanation["\s:]+["]([^"]+))?',
                 text,
                 re.DOTALL
             )
@@ -95,12 +146,14 @@ def extract_json_from_text(text: str) -> Dict[str, Any]:
                 if len(options) < 4:
                     options.extend(["Extra option"] * (4 - len(options)))
 
-                questions.append({
+                question = {
                     "question": q.strip(),
                     "options": options[:4],
-                    "correctAnswer": ans.strip(),
-                    "explanation": exp.strip()
-                })
+                    "correctAnswer": ans.strip()
+                }
+                if exp:  # Absent when explanations are generated separately
+                    question["explanation"] = exp.strip()
+                questions.append(question)
 
             if not questions:
                 raise ValueError("No questions found in the text")
@@ -1,40 +1,304 @@
-import PyPDF2
+import hashlib
+import io
+import importlib.util
 import logging
-import tempfile
-from typing import Optional, Tuple
+import os
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+from .document import Document, build_document, document_from_payload
+from .profiling import profiled
+from .result_store import result_store
+from .text_normalizer import normalize_pages
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Module logger (configured by the application entry point)
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(uploaded_file) -> Tuple[Optional[str], Optional[str]]:
+# Extractor backend selection: "auto" tries the fastest installed backend first,
+# or a comma-separated list such as "pdfminer,pypdf2" fixes the order
+PDF_EXTRACTOR_BACKEND = os.getenv("PDF_EXTRACTOR_BACKEND", "auto")
+
+# Pre-flight limits for large uploads
+PDF_MAX_UPLOAD_MB = float(os.getenv("PDF_MAX_UPLOAD_MB", "50"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "300"))
+# What to do with documents over PDF_MAX_PAGES: "reject", "range" (first pages only) or "sample"
+PDF_OVERSIZE_POLICY = os.getenv("PDF_OVERSIZE_POLICY", "sample")
+OVERSIZE_POLICIES = ("reject", "range", "sample")
+
+# PDFium is not thread-safe, not even across different documents, so every
+# pypdfium2 call in this process goes through this lock. Corpus extraction runs
+# in worker processes, each with its own lock.
+_pdfium_lock = threading.Lock()
+
+def _extract_with_pypdfium2(source: BinaryIO, page_indices: Optional[List[int]] = None) -> List[str]:
+    """Extract page text with pypdfium2 (PDFium bindings, fastest)."""
+    import pypdfium2 as pdfium
+
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(source)
+        try:
+            pages = []
+            for index in (page_indices if page_indices is not None else range(len(pdf))):
+                page = pdf[index]
+                text_page = page.get_textpage()
+                pages.append(text_page.get_text_range().replace("\r\n", "\n"))
+                text_page.close()
+                page.close()
+            return pages
+        finally:
+            pdf.close()
+
+def _extract_with_pdfminer(source: BinaryIO, page_indices: Optional[List[int]] = None) -> List[str]:
+    """Extract page text with pdfminer.six (layout-aware, slower than PDFium)."""
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    pages = []
+    for layout in extract_pages(source, page_numbers=page_indices):
+        pages.append("".join(element.get_text() for element in layout if isinstance(element, LTTextContainer)))
+    return pages
+
+def _extract_with_pypdf2(source: BinaryIO, page_indices: Optional[List[int]] = None) -> List[str]:
+    """Extract page text with PyPDF2 (pure Python, always installed)."""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(source)
+    if page_indices is None:
+        page_indices = range(len(pdf_reader.pages))
+    return [pdf_reader.pages[index].extract_text() or "" for index in page_indices]
+
+# Registered backends, fastest first: name -> (importable module, extractor)
+PDF_BACKENDS: Dict[str, Tuple[str, Callable[[BinaryIO, Optional[List[int]]], List[str]]]] = {
+    "pypdfium2": ("pypdfium2", _extract_with_pypdfium2),
+    "pdfminer": ("pdfminer", _extract_with_pdfminer),
+    "pypdf2": ("PyPDF2", _extract_with_pypdf2),
+}
+
+_timings_lock = threading.Lock()
+_backend_timings: Dict[str, Dict[str, float]] = {}
+
+def available_backends() -> List[str]:
+    """Return the installed extractor backends in the configured order."""
+    if PDF_EXTRACTOR_BACKEND.strip().lower() == "auto":
+        names = list(PDF_BACKENDS)
+    else:
+        names = [name.strip().lower() for name in PDF_EXTRACTOR_BACKEND.split(",") if name.strip()]
+        unknown = [name for name in names if name not in PDF_BACKENDS]
+        if unknown:
+            logger.warning(f"Ignoring unknown PDF extractor backends: {', '.join(unknown)}")
+
+    return [
+        name for name in names
+        if name in PDF_BACKENDS and importlib.util.find_spec(PDF_BACKENDS[name][0]) is not None
+    ]
+
+def _record_timing(backend: str, seconds: float, pages: int, failed: bool):
+    with _timings_lock:
+        stats = _backend_timings.setdefault(
+            backend, {"calls": 0, "failures": 0, "pages": 0, "total_seconds": 0.0}
+        )
+        stats["calls"] += 1
+        stats["failures"] += int(failed)
+        stats["pages"] += pages
+        stats["total_seconds"] += seconds
+
+def get_backend_timings() -> Dict[str, Dict[str, float]]:
     """
-    Extract text from PDF file
+    Return cumulative extraction timings per backend
+    
+    Returns:
+        Dictionary mapping backend name to call, failure and page counts,
+        total seconds and average seconds per page
+    """
+    with _timings_lock:
+        timings = {}
+        for backend, stats in _backend_timings.items():
+            timings[backend] = dict(
+                stats,
+                seconds_per_page=stats["total_seconds"] / stats["pages"] if stats["pages"] else 0.0,
+            )
+        return timings
+
+def extract_pages(source: BinaryIO, page_indices: Optional[List[int]] = None) -> Tuple[List[str], str]:
+    """
+    Extract per-page text using the first backend that succeeds
+    
+    Args:
+        source: Seekable binary stream with the PDF
+        page_indices: 0-based pages to extract (None for all pages)
+        
+    Returns:
+        Tuple containing:
+            - Text for each page
+            - Name of the backend that produced it
+            
+    Raises:
+        Exception: The last backend error if every backend fails
+    """
+    backends = available_backends()
+    if not backends:
+        raise RuntimeError("No PDF extractor backend is installed")
+
+    last_error = None
+    for backend in backends:
+        extractor = PDF_BACKENDS[backend][1]
+        started = time.perf_counter()
+        try:
+            source.seek(0)
+            pages = extractor(source, page_indices)
+        except Exception as e:
+            _record_timing(backend, time.perf_counter() - started, 0, failed=True)
+            logger.warning(f"PDF backend '{backend}' failed, falling back: {str(e)}")
+            last_error = e
+            continue
+
+        elapsed = time.perf_counter() - started
+        _record_timing(backend, elapsed, len(pages), failed=False)
+        logger.info(f"Extracted {len(pages)} pages with '{backend}' in {elapsed:.2f}s")
+        return pages, backend
+
+    raise last_error
+
+def _evenly_spaced_pages(page_count: int, sample_size: int) -> List[int]:
+    """Pick sample_size pages spread across the document, always including the first and last."""
+    if sample_size >= page_count:
+        return list(range(page_count))
+    if sample_size <= 1:
+        return [0]
+    step = (page_count - 1) / (sample_size - 1)
+    return sorted({round(i * step) for i in range(sample_size)})
+
+def _declared_page_count(uploaded_file) -> int:
+    """Read the page count recorded in the page tree root without loading the page tree."""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(uploaded_file)
+    try:
+        return int(reader.trailer["/Root"]["/Pages"]["/Count"])
+    except (KeyError, TypeError, ValueError) as e:
+        # Malformed page tree root: count the pages the slow way
+        logger.warning(f"PDF has no usable page count ({str(e)}), counting pages")
+        return len(reader.pages)
+
+def preflight_pdf(uploaded_file) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Check an upload's size and page count before extracting any text
+    
+    Only the cross-reference table, trailer and page tree root are read, so this
+    is cheap even for very large documents.
     
     Args:
         uploaded_file: Streamlit uploaded file object
         
     Returns:
         Tuple containing:
-            - PDF content as string (or None if failed)
+            - Plan with size_bytes, page_count, the applied policy (or None) and
+              the 0-based pages to extract (None for all pages)
+            - Error message if the upload is rejected (or None)
+    """
+    uploaded_file.seek(0, io.SEEK_END)
+    size_bytes = uploaded_file.tell()
+    uploaded_file.seek(0)
+
+    if size_bytes > PDF_MAX_UPLOAD_MB * 1024 * 1024:
+        return None, (
+            f"This PDF is {size_bytes / (1024 * 1024):.1f} MB, which exceeds the "
+            f"{PDF_MAX_UPLOAD_MB:.0f} MB limit. Please upload a smaller document."
+        )
+
+    page_count = _declared_page_count(uploaded_file)
+    uploaded_file.seek(0)
+    plan = {"size_bytes": size_bytes, "page_count": page_count, "policy": None, "pages": None}
+    if page_count <= PDF_MAX_PAGES:
+        return plan, None
+
+    policy = PDF_OVERSIZE_POLICY.strip().lower()
+    if policy not in OVERSIZE_POLICIES:
+        logger.warning(f"Unknown PDF_OVERSIZE_POLICY '{policy}', rejecting oversized document")
+        policy = "reject"
+
+    if policy == "reject":
+        return None, (
+            f"This PDF has {page_count} pages, which exceeds the {PDF_MAX_PAGES}-page limit. "
+            "Please upload a shorter document or split it into parts."
+        )
+
+    plan["policy"] = policy
+    if policy == "range":
+        plan["pages"] = list(range(PDF_MAX_PAGES))
+    else:
+        plan["pages"] = _evenly_spaced_pages(page_count, PDF_MAX_PAGES)
+    logger.info(f"Document has {page_count} pages, applying '{policy}' policy to {len(plan['pages'])} pages")
+    return plan, None
+
+def _file_hash(stream: BinaryIO) -> str:
+    """Hash a binary stream in chunks and rewind it."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+@profiled("extract_text_from_pdf")
+def extract_document_from_pdf(uploaded_file, normalize: bool = True) -> Tuple[Optional[Document], Optional[str]]:
+    """
+    Extract a structured document (pages, headings, paragraphs) from a PDF file
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        normalize: Strip repeated headers/footers and collapse whitespace before
+            building the document
+        
+    Returns:
+        Tuple containing:
+            - Document model (or None if failed)
             - Error message (or None if successful)
     """
     try:
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file.flush()
+        plan, error = preflight_pdf(uploaded_file)
+        if error:
+            return None, error
+
+        # Reuse an extraction done by any worker process for the same file and settings
+        cache_key = f"{_file_hash(uploaded_file)}:{int(normalize)}:{plan['policy']}:{PDF_MAX_PAGES}"
+        cached = result_store.get("extraction", cache_key)
+        if cached is not None:
+            logger.info("Using cached extraction result")
+            return document_from_payload(cached), None
 
-            pdf_reader = PyPDF2.PdfReader(tmp_file.name)
-            pdf_content = ""
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                if text:
-                    pdf_content += text + "\n"
+        started = time.perf_counter()
+        pages, backend = extract_pages(uploaded_file, plan["pages"])
 
-            if not pdf_content.strip():
-                return None, "No readable content found in the PDF. Please upload a valid document."
+        if not any(page.strip() for page in pages):
+            return None, "No readable content found in the PDF. Please upload a valid document."
 
-            return pdf_content, None
+        metadata = {"backend": backend, "extraction_seconds": time.perf_counter() - started, "preflight": plan}
+        if normalize:
+            pages, metadata["normalization"] = normalize_pages(pages)
+
+        document = build_document(pages, metadata)
+        result_store.put("extraction", cache_key, document.to_payload())
+        logger.info(f"Extracted {document.page_count} pages")
+        return document, None
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}")
         return None, f"Error processing PDF: {str(e)}"
+
+@profiled("extract_text_from_pdf")
+def extract_text_from_pdf(uploaded_file) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract text from PDF file
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        
+    Returns:
+        Tuple containing:
+            - PDF content as string (or None if failed)
+            - Error message (or None if successful)
+    """
+    document, error = extract_document_from_pdf(uploaded_file)
+    if error:
+        return None, error
+    return document.text, None
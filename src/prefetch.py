@@ -0,0 +1,236 @@
+import io
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from .document import Document
+from .pdf_processor import extract_document_from_pdf
+from .quiz_generator import generate_quiz
+from .scheduler import PRIORITY_BATCH, admission_event
+from .summary_generator import generate_summary
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Speculative pre-generation configuration
+PREFETCH_ON_UPLOAD = os.getenv("PREFETCH_ON_UPLOAD", "0").lower() in ("1", "true", "yes")
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+PREFETCH_MAX_JOBS = 64  # Sessions with a retained prefetch job
+PREFETCH_RESULT_TTL_SECONDS = 30 * 60  # Unclaimed results are dropped after this long
+PREFETCH_START_WAIT_SECONDS = 0.5  # How long the page waits for a queued job to start before working inline
+PREFETCH_CLAIM_WAIT_SECONDS = float(os.getenv("PREFETCH_CLAIM_WAIT", "2"))  # Wait for a speculative result on click
+
+STEPS = ("document", "summary", "quiz")
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+
+class PrefetchJob:
+    """
+    Background extraction, summary and quiz generation for one upload
+
+    Once the document is extracted, the summary and the quiz are generated
+    independently at batch priority. Speculative calls carry no session id,
+    so they do not use up the user's rate limit before they click anything.
+    Each step's result can be awaited or claimed on its own, and cancelling
+    the job (or one step) stops it while it waits for an LLM slot; a call
+    that is already running is left to finish.
+    """
+
+    def __init__(self, upload_key: str, data: bytes):
+        self.upload_key = upload_key
+        self.created = time.monotonic()
+        self.started = threading.Event()
+        self.cancelled = threading.Event()
+        self._data: Optional[bytes] = data
+        self._results: Dict[str, Any] = {}
+        self._done = {step: threading.Event() for step in STEPS}
+        self._step_cancelled = {step: threading.Event() for step in STEPS}
+        self._step_running = {step: threading.Event() for step in STEPS}  # An LLM call was admitted
+
+    def cancel(self):
+        """Stop the job and release the uploaded bytes and any results."""
+        if not self.cancelled.is_set():
+            logger.info(f"Cancelling prefetch for upload {self.upload_key}")
+        self.cancelled.set()
+        self._data = None
+        self._results.clear()
+        for step in STEPS:
+            self._step_cancelled[step].set()
+            self._done[step].set()
+
+    def is_ready(self, step: str) -> bool:
+        return self._done[step].is_set()
+
+    def result(self, step: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Wait for a step and return its result
+
+        Args:
+            step: "document", "summary" or "quiz"
+            timeout: Seconds to wait (None waits until the step finishes)
+
+        Returns:
+            The step's result, or None if it failed, was cancelled or timed out
+        """
+        self._done[step].wait(timeout)
+        return self._results.get(step)
+
+    def claim(self, step: str, timeout: float = PREFETCH_CLAIM_WAIT_SECONDS) -> Optional[Any]:
+        """
+        Take a step's result for a user who explicitly asked for it
+
+        If the step is still waiting for an LLM slot after the timeout, it is
+        cancelled so the caller's interactive request does not queue behind it.
+        If its LLM call is already running, the caller waits for that result:
+        generating it again would queue behind the running call anyway and
+        double its cost.
+
+        Args:
+            step: "summary" or "quiz"
+            timeout: Seconds to wait for the speculative result
+
+        Returns:
+            The step's result, or None if the caller should generate it itself
+        """
+        if not self._done[step].wait(timeout):
+            # Cancel first, then check, so a call admitted in between is not missed
+            self._step_cancelled[step].set()
+            if self._step_running[step].is_set():
+                self._step_cancelled[step].clear()
+                logger.info(f"Prefetched {step} is already being generated, waiting for it")
+                self._done[step].wait()
+            else:
+                logger.info(f"Prefetched {step} still queued after {timeout:.1f}s, generating it interactively")
+        return self._results.get(step)
+
+    def _finish(self, step: str, value: Any):
+        if not self._step_cancelled[step].is_set():
+            self._results[step] = value
+        self._done[step].set()
+
+    def _run_step(self, step: str, generate, source: Document, **kwargs):
+        token = admission_event.set(self._step_running[step])
+        try:
+            if not self._step_cancelled[step].is_set():
+                self._finish(step, generate(
+                    source.text, session_id=None, priority=PRIORITY_BATCH,
+                    cancel_event=self._step_cancelled[step], **kwargs
+                ))
+        except Exception as e:
+            logger.error(f"Prefetch {step} error: {str(e)}")
+        finally:
+            admission_event.reset(token)
+            self._done[step].set()
+
+    def run(self):
+        self.started.set()
+        try:
+            if self.cancelled.is_set():
+                return
+
+            document, error = extract_document_from_pdf(io.BytesIO(self._data))
+            self._data = None
+            if error:
+                logger.warning(f"Prefetch extraction failed: {error}")
+            self._finish("document", document)
+            if document is None or self.cancelled.is_set():
+                return
+
+            # The quiz does not need the summary, so both wait for an LLM slot at once
+            quiz = threading.Thread(
+                target=self._run_step, args=("quiz", generate_quiz, document), name="prefetch-quiz", daemon=True
+            )
+            quiz.start()
+            self._run_step("summary", generate_summary, document, document=document)
+            quiz.join()
+        except Exception as e:
+            logger.error(f"Prefetch error: {str(e)}")
+        finally:
+            # Wake up anyone waiting on steps that never ran
+            for done in self._done.values():
+                done.set()
+
+
+class PrefetchLease:
+    """
+    Ties a session's prefetch job to the session's lifetime
+
+    Keep the lease in the session state: when the session ends and its state
+    is garbage collected, the lease's finalizer cancels the session's job.
+    """
+
+    __slots__ = ("session_id", "__weakref__")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        weakref.finalize(self, cancel_prefetch, session_id)
+
+
+_jobs_lock = threading.Lock()
+_jobs: "OrderedDict[str, PrefetchJob]" = OrderedDict()
+
+
+def _reap_jobs():
+    """Cancel jobs nobody has claimed for too long, and the oldest beyond the cap."""
+    now = time.monotonic()
+    for key, job in list(_jobs.items()):
+        if now - job.created > PREFETCH_RESULT_TTL_SECONDS:
+            job.cancel()
+            del _jobs[key]
+    while len(_jobs) > PREFETCH_MAX_JOBS:
+        _, job = _jobs.popitem(last=False)
+        job.cancel()
+
+
+def start_prefetch(session_id: str, upload_key: str, data: bytes) -> PrefetchJob:
+    """
+    Start speculative processing of an upload for a session
+
+    Any earlier job for the same session is cancelled first, so replacing or
+    removing an upload releases its resources.
+
+    Args:
+        session_id: Identifier of the session that uploaded the file
+        upload_key: Identifier of the uploaded file
+        data: Raw PDF bytes
+
+    Returns:
+        The running job
+    """
+    with _jobs_lock:
+        existing = _jobs.pop(session_id, None)
+        if existing is not None and existing.upload_key == upload_key and not existing.cancelled.is_set():
+            _jobs[session_id] = existing
+            return existing
+        if existing is not None:
+            existing.cancel()
+
+        job = PrefetchJob(upload_key, data)
+        _jobs[session_id] = job
+        _reap_jobs()
+
+    logger.info(f"Starting prefetch for upload {upload_key}")
+    _executor.submit(job.run)
+    return job
+
+
+def get_prefetch(session_id: str, upload_key: str) -> Optional[PrefetchJob]:
+    """Return the session's prefetch job if it belongs to this upload and is still live."""
+    with _jobs_lock:
+        job = _jobs.get(session_id)
+    if job is None or job.upload_key != upload_key or job.cancelled.is_set():
+        return None
+    return job
+
+
+def cancel_prefetch(session_id: str):
+    """Cancel and forget the session's prefetch job, if any."""
+    with _jobs_lock:
+        job = _jobs.pop(session_id, None)
+    if job is not None:
+        job.cancel()
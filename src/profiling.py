@@ -0,0 +1,199 @@
+import contextvars
+import cProfile
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Profiling configuration
+PROFILE_ENABLED = os.getenv("PDFQ_PROFILE", "0").lower() in ("1", "true", "yes")
+# Whether a visitor may turn on profiling for their own requests (?profile=1 in the app's URL)
+PROFILE_ON_REQUEST = os.getenv("PDFQ_PROFILE_ON_REQUEST", "0").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PDFQ_PROFILE_DIR", "profiles")
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 25
+
+
+class ProfileSession:
+    """Collects the profiles of every instrumented stage run during one request."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.directory = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{request_id}")
+        self.stages: List[Dict[str, Any]] = []
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_prefix(self, stage: str) -> str:
+        return os.path.join(self.directory, f"{next(self._sequence):02d}-{stage}")
+
+    def add_stage(self, record: Dict[str, Any]):
+        with self._lock:
+            self.stages.append(record)
+
+    def write_summary(self):
+        if not self.stages:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "summary.json"), "w", encoding="utf-8") as summary_file:
+            json.dump({"request_id": self.request_id, "stages": self.stages}, summary_file, indent=2)
+        logger.info(f"Profile for request {self.request_id} written to {self.directory}")
+
+
+_session: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+_active_stage: contextvars.ContextVar = contextvars.ContextVar("profile_active_stage", default=None)
+
+# tracemalloc is process-wide, so it is started by the first profiled stage and stopped by the last
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _start_tracemalloc() -> bool:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            return False  # Someone else is tracing; leave it alone
+        if _tracemalloc_users == 0:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        _tracemalloc_users += 1
+        return True
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+@contextmanager
+def profile_request(request_id: Optional[str] = None, enabled: Optional[bool] = None) -> Iterator[Optional[ProfileSession]]:
+    """
+    Profile every instrumented stage run inside the block
+
+    Args:
+        request_id: Name for the profile directory (a random id by default)
+        enabled: Force profiling on or off; defaults to the PDFQ_PROFILE setting
+
+    Yields:
+        The active ProfileSession, or None when profiling is off
+    """
+    if not (PROFILE_ENABLED if enabled is None else enabled):
+        yield None
+        return
+
+    session = ProfileSession(request_id or uuid.uuid4().hex[:8])
+    token = _session.set(session)
+    try:
+        yield session
+    finally:
+        _session.reset(token)
+        try:
+            session.write_summary()
+        except OSError as e:
+            logger.error(f"Could not write profile summary: {str(e)}")
+
+
+def propagate_context(func: Callable) -> Callable:
+    """
+    Wrap func so it runs in a copy of the caller's context on another thread
+
+    The active profile session lives in context variables, which worker
+    threads do not inherit. Wrap work handed to a thread pool with this so
+    its stages are added to the caller's profile. Only use it for work the
+    caller waits for: background jobs that outlive the request (prefetch,
+    question bank filling) are profiled in one-off sessions when PDFQ_PROFILE
+    is set, and work in worker processes is not profiled.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Each call gets its own copy, since a context cannot be entered by two threads at once
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def _run_profiled(session: ProfileSession, stage: str, func: Callable, args: tuple, kwargs: dict) -> Any:
+    prefix = session.next_prefix(stage)
+    tracing = _start_tracemalloc()
+    before = tracemalloc.take_snapshot() if tracing else None
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    token = _active_stage.set(stage)
+    try:
+        try:
+            profiler.enable()
+            profiling = True
+        except ValueError as e:
+            # Only one cProfile can be active at a time on newer Python versions
+            logger.warning(f"Skipping cProfile for {stage}: {str(e)}")
+            profiling = False
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profiling:
+                profiler.disable()
+    finally:
+        _active_stage.reset(token)
+        elapsed = time.perf_counter() - started
+        record = {"stage": stage, "seconds": round(elapsed, 4)}
+        try:
+            os.makedirs(session.directory, exist_ok=True)
+            if profiling:
+                profiler.dump_stats(f"{prefix}.prof")
+                record["profile"] = f"{prefix}.prof"
+            if tracing:
+                after = tracemalloc.take_snapshot()
+                record["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+                top = after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]
+                with open(f"{prefix}-allocations.txt", "w", encoding="utf-8") as allocations_file:
+                    allocations_file.write("\n".join(str(stat) for stat in top))
+                record["allocations"] = f"{prefix}-allocations.txt"
+        except OSError as e:
+            logger.error(f"Could not write profile for {stage}: {str(e)}")
+        finally:
+            if tracing:
+                _stop_tracemalloc()
+        session.add_stage(record)
+
+
+def profiled(stage: str) -> Callable:
+    """
+    Decorator that profiles a pipeline stage when profiling is active
+
+    The wrapped function runs under cProfile with tracemalloc snapshots taken
+    around it. Stages called from inside another profiled stage are not
+    profiled again. Outside a profile_request block, a one-off session is
+    created per call if PDFQ_PROFILE is set; otherwise the call is untouched.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_stage.get() is not None:
+                return func(*args, **kwargs)
+
+            session = _session.get()
+            if session is not None:
+                return _run_profiled(session, stage, func, args, kwargs)
+
+            if not PROFILE_ENABLED:
+                return func(*args, **kwargs)
+
+            with profile_request(f"{stage}-{uuid.uuid4().hex[:8]}", enabled=True) as one_off:
+                return _run_profiled(one_off, stage, func, args, kwargs)
+
+        return wrapper
+    return decorator
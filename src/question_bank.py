@@ -0,0 +1,275 @@
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from .document import Document, content_hash
+from .document_store import document_key, document_store
+from .quiz_generator import generate_quiz
+from .result_store import result_store
+from .scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Question bank configuration
+QUIZ_SIZE = 10
+BANK_TARGET_SIZE = 40  # Questions to collect per document in the background
+BANK_MAX_SIZE = 100  # Hard cap; sessions start over once they have seen this many
+BANK_TOP_UP = 2 * QUIZ_SIZE  # Questions added by each top-up beyond the initial target
+BANK_LOW_WATER = QUIZ_SIZE  # Top up when a session has fewer unseen questions than this
+MAX_FILL_FAILURES = 3  # Consecutive duplicate-only batches before the bank counts as exhausted
+MAX_FILL_ERRORS = 3  # Consecutive failed batches before the fill stops until the next top-up
+FILL_BACKOFF_SECONDS = 5.0  # First wait after a failed batch; doubles with each further failure
+MAX_AVOID_QUESTIONS = 30  # Existing questions listed in the prompt to steer away from repeats
+MAX_BANKS = 64  # Documents kept in memory
+
+
+def _question_key(question: Dict[str, Any]) -> str:
+    """Normalize question text so near-identical duplicates are detected."""
+    return re.sub(r'[^a-z0-9]+', ' ', question["question"].lower()).strip()
+
+
+class QuestionBank:
+    """
+    Pool of validated quiz questions for one document
+
+    Questions are generated in batches on a background thread and each
+    session is served questions it has not seen yet. The pool is mirrored in
+    the shared result store so other worker processes reuse it.
+    """
+
+    def __init__(self, document_hash: str, pdf_content: str):
+        self.document_hash = document_hash
+        # Reference the document the sessions already hold in the shared store, so the
+        # text is not stored a second time; text without a stored document is put on its own
+        self._content = document_store.acquire(document_key(pdf_content)) or document_store.put(pdf_content)
+        self.questions: List[Dict[str, Any]] = []
+        self._keys = set()
+        self._served: Dict[Optional[str], set] = {}
+        self._lock = threading.Lock()
+        self._filler: Optional[threading.Thread] = None
+        self.exhausted = False  # No more new questions can be generated
+        self.sync()
+
+    @property
+    def pdf_content(self) -> Optional[str]:
+        value = self._content.value
+        return value.text if isinstance(value, Document) else value
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.questions)
+
+    def add(self, questions: List[Dict[str, Any]]) -> int:
+        """
+        Add questions to the bank, skipping duplicates
+
+        Returns:
+            Number of new questions added
+        """
+        added = 0
+        with self._lock:
+            for question in questions:
+                key = _question_key(question)
+                if key and key not in self._keys:
+                    self._keys.add(key)
+                    self.questions.append(question)
+                    added += 1
+        return added
+
+    def sync(self):
+        """Merge the pool with the copy in the shared result store and write it back."""
+        stored = result_store.get("question_bank", self.document_hash)
+        if stored:
+            self.add(stored.get("questions", []))
+            self.exhausted = self.exhausted or stored.get("exhausted", False)
+
+        with self._lock:
+            if not self.questions:
+                return
+            payload = {"questions": list(self.questions), "exhausted": self.exhausted}
+        result_store.put("question_bank", self.document_hash, payload)
+
+    def mark_served(self, session_id: Optional[str], questions: List[Dict[str, Any]]):
+        """Record that a session has already seen these questions."""
+        with self._lock:
+            served = self._served.setdefault(session_id, set())
+            served.update(_question_key(question) for question in questions)
+
+    def unseen_count(self, session_id: Optional[str]) -> int:
+        with self._lock:
+            served = self._served.get(session_id, set())
+            return sum(1 for question in self.questions if _question_key(question) not in served)
+
+    def question_texts(self, limit: int = MAX_AVOID_QUESTIONS) -> List[str]:
+        """Return the most recent question texts, used to steer generation away from repeats."""
+        with self._lock:
+            return [question["question"] for question in self.questions[-limit:]]
+
+    def sample(self, count: int, session_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Draw questions the session has not been served yet
+
+        Args:
+            count: Number of questions wanted
+            session_id: Session the questions are for
+
+        Returns:
+            List of question copies, or None if the bank cannot fill a quiz with
+            unseen questions yet
+        """
+        with self._lock:
+            served = self._served.setdefault(session_id, set())
+            unseen = [question for question in self.questions if _question_key(question) not in served]
+
+            if len(unseen) >= count:
+                chosen = random.sample(unseen, count)
+            elif self.exhausted and len(self.questions) >= count:
+                # The session has seen everything the bank will ever hold, so start over
+                seen = [question for question in self.questions if _question_key(question) in served]
+                chosen = unseen + random.sample(seen, count - len(unseen))
+                random.shuffle(chosen)
+                served.clear()
+            else:
+                return None
+
+            served.update(_question_key(question) for question in chosen)
+
+        return [dict(question, options=list(question["options"])) for question in chosen]
+
+    @property
+    def filling(self) -> bool:
+        return self._filler is not None and self._filler.is_alive()
+
+    def ensure_filling(self):
+        """Start a background top-up unless one is running or the bank is full."""
+        with self._lock:
+            if self.filling or self.exhausted:
+                return
+            target = min(BANK_MAX_SIZE, max(BANK_TARGET_SIZE, len(self.questions) + BANK_TOP_UP))
+            self._filler = threading.Thread(
+                target=self._fill, args=(target,), name=f"question-bank-{self.document_hash[:8]}", daemon=True
+            )
+            self._filler.start()
+
+    def _fill(self, target: int):
+        duplicates = 0  # Batches that only repeated existing questions
+        errors = 0  # Batches that failed, e.g. rejected by a busy scheduler or with Ollama down
+        while len(self) < target and duplicates < MAX_FILL_FAILURES and errors < MAX_FILL_ERRORS:
+            pdf_content = self.pdf_content
+            if pdf_content is None:
+                logger.error(f"Question bank {self.document_hash[:8]} lost its document, stopping the fill")
+                return
+            quiz = generate_quiz(pdf_content, priority=PRIORITY_BATCH, avoid_questions=self.question_texts())
+            if "error" in quiz:
+                errors += 1
+                logger.warning(f"Question bank batch failed ({errors}/{MAX_FILL_ERRORS}): {quiz['error']}")
+                time.sleep(FILL_BACKOFF_SECONDS * 2 ** (errors - 1))
+                continue
+
+            errors = 0
+            added = self.add(quiz.get("questions", []))
+            self.sync()
+            if added:
+                duplicates = 0
+            else:
+                duplicates += 1
+                logger.warning("Question bank batch added nothing: only duplicates")
+
+        # Only running out of new questions exhausts the bank; errors leave it to a later top-up
+        if duplicates >= MAX_FILL_FAILURES or len(self) >= BANK_MAX_SIZE:
+            self.exhausted = True
+            self.sync()
+        logger.info(f"Question bank {self.document_hash[:8]} holds {len(self)} questions")
+
+
+_banks_lock = threading.Lock()
+_banks: "OrderedDict[str, QuestionBank]" = OrderedDict()
+
+
+def get_question_bank(pdf_content: str) -> QuestionBank:
+    """Return the question bank for a document, creating it if needed."""
+    document_hash = content_hash(pdf_content)
+    with _banks_lock:
+        bank = _banks.get(document_hash)
+        if bank is None:
+            bank = _banks[document_hash] = QuestionBank(document_hash, pdf_content)
+            while len(_banks) > MAX_BANKS:
+                _banks.popitem(last=False)
+        else:
+            _banks.move_to_end(document_hash)
+        return bank
+
+
+def seed_question_bank(
+    pdf_content: str,
+    quiz: Dict[str, Any],
+    session_id: Optional[str] = None,
+    served_questions: Optional[List[Dict[str, Any]]] = None,
+):
+    """
+    Add a quiz generated outside the bank and start filling the bank
+
+    Args:
+        pdf_content: Text extracted from PDF
+        quiz: Quiz data returned by generate_quiz
+        session_id: Session the quiz is being shown to, so it is not served again
+        served_questions: The questions actually shown to the session
+            (defaults to all of the quiz's questions)
+    """
+    bank = get_question_bank(pdf_content)
+    if "questions" in quiz:
+        if bank.add(quiz["questions"]):
+            bank.sync()
+        bank.mark_served(session_id, quiz["questions"] if served_questions is None else served_questions)
+    bank.ensure_filling()
+
+
+def generate_quiz_from_bank(
+    pdf_content: str,
+    session_id: Optional[str] = None,
+    num_questions: int = QUIZ_SIZE,
+    priority: int = PRIORITY_INTERACTIVE,
+    cancel_event: Optional[threading.Event] = None,
+    rate_limited: bool = True,
+) -> Dict[str, Any]:
+    """
+    Build a quiz from the document's question bank
+
+    Falls back to a direct generate_quiz call when the bank cannot fill a quiz
+    yet, seeding the bank with the result. Either way a background top-up is
+    started when the session is running low on unseen questions.
+
+    Args:
+        pdf_content: Text extracted from PDF
+        session_id: Identifier of the calling session
+        num_questions: Number of questions in the quiz
+        priority: Scheduler priority class for a direct generation call
+        cancel_event: Event that abandons a direct generation call when set
+        rate_limited: Count a direct generation call against the session's
+            rate limit (off for all but one part of a multi-document quiz)
+
+    Returns:
+        Dictionary containing quiz data (questions, options, answers)
+    """
+    bank = get_question_bank(pdf_content)
+    questions = bank.sample(num_questions, session_id)
+
+    if questions is None:
+        quiz = generate_quiz(
+            pdf_content, session_id=session_id if rate_limited else None, priority=priority,
+            cancel_event=cancel_event, avoid_questions=bank.question_texts()
+        )
+        if "questions" not in quiz:
+            return quiz
+        # Questions beyond this quiz stay in the bank, unseen, for the next one
+        shown = quiz["questions"][:num_questions]
+        seed_question_bank(pdf_content, quiz, session_id, served_questions=shown)
+        return dict(quiz, questions=shown)
+
+    if bank.unseen_count(session_id) < BANK_LOW_WATER:
+        bank.ensure_filling()
+    return {"questions": questions}
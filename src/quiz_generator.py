@@ -1,18 +1,45 @@
 import logging
-from typing import Dict, Any
-from .llm_interface import call_ollama_api, extract_json_from_text
+import os
+import threading
+from typing import Dict, Any, List, Optional
+from .document import content_hash
+from .llm_interface import MODEL_NAME, call_ollama_api, extract_json_from_text
+from .profiling import profiled
+from .result_store import result_store
+from .scheduler import AdmissionRejected, GenerationCancelled, PRIORITY_INTERACTIVE
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Module logger (configured by the application entry point)
 logger = logging.getLogger(__name__)
 
-def generate_quiz_prompt(pdf_content: str) -> str:
+# Explanation mode: "upfront" writes them with the quiz, "lazy" after the quiz is
+# submitted and "wrong" after submission only for wrongly answered questions
+QUIZ_EXPLANATIONS = os.getenv("QUIZ_EXPLANATIONS", "lazy").lower()
+
+@profiled("build_prompt")
+def generate_quiz_prompt(
+    pdf_content: str,
+    avoid_questions: Optional[List[str]] = None,
+    include_explanations: bool = True,
+) -> str:
     """
     Create the prompt to generate a quiz from the entire PDF content without any character limit.
+    Questions listed in avoid_questions are shown to the model so it writes new ones.
+    Without include_explanations the model only writes questions, options and answers.
     """
     # Use the full content without truncation
     full_content = pdf_content
+
+    avoid_section = ""
+    if avoid_questions:
+        listed = "\n".join(f"- {question}" for question in avoid_questions)
+        avoid_section = f"""
+4. Do NOT repeat or rephrase any of these existing questions; cover different facts instead:
+{listed}
+"""
     
+    explanation_requirement = "\n   - A brief explanation of the correct answer" if include_explanations else ""
+    explanation_field = ',\n      "explanation": "Explanation for the correct answer"' if include_explanations else ""
+
     prompt = f"""
 Task: You are an expert educational quiz creator. Analyze the following PDF content and generate a multiple-choice quiz.
 
@@ -26,10 +53,9 @@ Quiz Requirements:
 2. Each question MUST include:
    - A clear and direct question
    - EXACTLY four answer options (A, B, C, D)
-   - One correct answer
-   - A brief explanation of the correct answer
+   - One correct answer{explanation_requirement}
 3. Ensure that all questions have exactly 4 options, not more, not less.
-
+{avoid_section}
 Return the result in strict JSON format as follows:
 
 ```json
@@ -38,14 +64,12 @@ Return the result in strict JSON format as follows:
     {{
       "question": "First question text",
       "options": ["Option A", "Option B", "Option C", "Option D"],
-      "correctAnswer": "The correct option exactly as written",
-      "explanation": "Explanation for the correct answer"
+      "correctAnswer": "The correct option exactly as written"{explanation_field}
     }},
     {{
       "question": "Second question text",
       "options": ["Option A", "Option B", "Option C", "Option D"],
-      "correctAnswer": "The correct option",
-      "explanation": "Explanation for the correct answer"
+      "correctAnswer": "The correct option"{explanation_field}
     }}
   ]
 }}
@@ -93,19 +117,45 @@ def ensure_four_options(quiz_data: Dict[str, Any]) -> Dict[str, Any]:
                 
     return quiz_data
 
-def generate_quiz(pdf_content: str) -> Dict[str, Any]:
+def generate_quiz(
+    pdf_content: str,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    cancel_event: Optional[threading.Event] = None,
+    avoid_questions: Optional[List[str]] = None,
+    include_explanations: Optional[bool] = None,
+) -> Dict[str, Any]:
     """
     Generate a quiz from PDF content
     
     Args:
         pdf_content: Text extracted from PDF
+        session_id: Identifier of the calling session, used for rate limiting
+        priority: Scheduler priority class for the LLM call
+        cancel_event: Event that abandons generation when set
+        avoid_questions: Existing question texts the model should not repeat
+        include_explanations: Have the model explain each answer up front;
+            defaults to the QUIZ_EXPLANATIONS setting. Without explanations
+            the quiz is much faster to generate; see generate_explanations.
         
     Returns:
-        Dictionary containing quiz data (questions, options, answers)
+        Dictionary containing quiz data (questions, options, answers and,
+        if requested, explanations)
     """
+    if include_explanations is None:
+        include_explanations = QUIZ_EXPLANATIONS == "upfront"
+
     try:
-        prompt = generate_quiz_prompt(pdf_content)
-        response = call_ollama_api(prompt)
+        # Only the first quiz for a document is shared; follow-up batches must differ
+        cache_key = f"{MODEL_NAME}:{content_hash(pdf_content)}" + ("" if include_explanations else ":brief")
+        if not avoid_questions:
+            cached = result_store.get("quiz", cache_key)
+            if cached is not None:
+                logger.info("Using cached quiz")
+                return cached
+
+        prompt = generate_quiz_prompt(pdf_content, avoid_questions, include_explanations)
+        response = call_ollama_api(prompt, priority=priority, session_id=session_id, cancel_event=cancel_event)
 
         if 'response' not in response:
             return {"error": "Invalid response from language model"}
@@ -120,7 +170,9 @@ def generate_quiz(pdf_content: str) -> Dict[str, Any]:
 
         cleaned_questions = []
         for q in quiz_data["questions"]:
-            if not all(key in q for key in ["question", "options", "correctAnswer", "explanation"]):
+            if not all(key in q for key in ["question", "options", "correctAnswer"]):
+                continue
+            if include_explanations and not q.get("explanation"):
                 continue
 
             if len(q["options"]) != 4:
@@ -139,7 +191,119 @@ def generate_quiz(pdf_content: str) -> Dict[str, Any]:
         if not cleaned_questions:
             return {"error": "No valid questions generated"}
 
-        return {"questions": cleaned_questions}
+        quiz = {"questions": cleaned_questions}
+        if not avoid_questions:
+            result_store.put("quiz", cache_key, quiz)
+        return quiz
+    except AdmissionRejected as e:
+        logger.warning(f"Quiz request rejected: {str(e)}")
+        return {"error": str(e)}
+    except GenerationCancelled:
+        logger.info("Quiz generation cancelled")
+        return {"error": "Quiz generation was cancelled."}
     except Exception as e:
         logger.error(f"Quiz generation error: {str(e)}")
         return {"error": f"Failed to generate quiz: {str(e)}"}
+
+@profiled("build_prompt")
+def generate_explanations_prompt(pdf_content: str, questions: List[Dict[str, Any]]) -> str:
+    """
+    Create the prompt that explains the correct answers of several quiz questions in one call.
+    """
+    listed = "\n\n".join(
+        f"{number}. {q['question']}\n   Correct answer: {q['correctAnswer']}"
+        for number, q in enumerate(questions, 1)
+    )
+
+    prompt = f"""
+Task: You are an expert educator. Using the PDF content below, briefly explain why each correct answer is right.
+
+PDF Content:
+```
+{pdf_content}
+```
+
+Questions:
+{listed}
+
+Write one or two sentences per question, based only on the PDF content.
+Return the result in strict JSON format as follows, with one entry per question in the same order:
+
+```json
+{{
+  "explanations": [
+    {{"number": 1, "explanation": "Why the first answer is correct"}},
+    {{"number": 2, "explanation": "Why the second answer is correct"}}
+  ]
+}}
+```
+
+Start your response directly with ```json and end with ``` — any extra formatting outside of these tags will cause processing errors.
+"""
+    return prompt
+
+def _explanation_key(pdf_content: str, question: Dict[str, Any]) -> str:
+    return f"{MODEL_NAME}:{content_hash(pdf_content)}:{content_hash(question['question'] + question['correctAnswer'])}"
+
+def generate_explanations(
+    pdf_content: str,
+    questions: List[Dict[str, Any]],
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Explain the correct answers of quiz questions generated without explanations
+    
+    Explanations already produced for the same document and question are reused;
+    all missing ones are written in a single batched LLM call.
+    
+    Args:
+        pdf_content: Text extracted from PDF
+        questions: Questions to explain (each with "question" and "correctAnswer")
+        session_id: Identifier of the calling session, used for rate limiting
+        priority: Scheduler priority class for the LLM call
+        cancel_event: Event that abandons generation when set
+        
+    Returns:
+        Dictionary with an "explanations" list aligned with questions (an entry
+        is empty if the model skipped that question), or an "error" message
+    """
+    explanations = [q.get("explanation") or result_store.get("explanation", _explanation_key(pdf_content, q))
+                    for q in questions]
+    missing = [i for i, explanation in enumerate(explanations) if not explanation]
+    if not missing:
+        return {"explanations": explanations}
+
+    try:
+        prompt = generate_explanations_prompt(pdf_content, [questions[i] for i in missing])
+        response = call_ollama_api(prompt, priority=priority, session_id=session_id, cancel_event=cancel_event)
+
+        if 'response' not in response:
+            return {"error": "Invalid response from language model"}
+
+        entries = extract_json_from_text(response['response']).get("explanations")
+        if not isinstance(entries, list):
+            return {"error": "Invalid explanation format, explanations list not found"}
+
+        for position, entry in enumerate(entries):
+            if isinstance(entry, dict):
+                number, text = entry.get("number", position + 1), entry.get("explanation")
+            else:
+                number, text = position + 1, entry
+            if not isinstance(number, int) or not 1 <= number <= len(missing) or not isinstance(text, str):
+                continue
+            index = missing[number - 1]
+            explanations[index] = text.strip()
+            result_store.put("explanation", _explanation_key(pdf_content, questions[index]), explanations[index])
+
+        return {"explanations": [explanation or "" for explanation in explanations]}
+    except AdmissionRejected as e:
+        logger.warning(f"Explanation request rejected: {str(e)}")
+        return {"error": str(e)}
+    except GenerationCancelled:
+        logger.info("Explanation generation cancelled")
+        return {"error": "Explanation generation was cancelled."}
+    except Exception as e:
+        logger.error(f"Explanation generation error: {str(e)}")
+        return {"error": f"Failed to generate explanations: {str(e)}"}
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Optional
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Shared result store configuration
+RESULT_STORE_ENABLED = os.getenv("RESULT_STORE_ENABLED", "1").lower() in ("1", "true", "yes")
+RESULT_STORE_PATH = os.getenv(
+    "RESULT_STORE_PATH", os.path.join(tempfile.gettempdir(), "pdf_quiz_summary_results.sqlite3")
+)
+RESULT_STORE_TTL_SECONDS = float(os.getenv("RESULT_STORE_TTL_SECONDS", str(7 * 24 * 3600)))
+COMPRESSION_LEVEL = 6
+PURGE_INTERVAL_SECONDS = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+class ResultStore:
+    """
+    Cross-process cache for extraction and generation results
+
+    Backed by a SQLite database in WAL mode so several Streamlit server
+    processes on the same host can share results. Values are stored as
+    zlib-compressed JSON with an expiry time; every write is a single atomic
+    statement. Storage errors are logged and treated as cache misses.
+    """
+
+    def __init__(self, path: str = RESULT_STORE_PATH, default_ttl: float = RESULT_STORE_TTL_SECONDS,
+                 enabled: bool = RESULT_STORE_ENABLED):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _key(namespace: str, key: str) -> str:
+        return f"{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Look up a stored value
+
+        Args:
+            namespace: Kind of result, e.g. "summary" or "extraction"
+            key: Cache key within the namespace
+
+        Returns:
+            The stored value, or None if missing, expired or unreadable
+        """
+        if not self.enabled:
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT payload FROM results WHERE key = ? AND expires_at > ?",
+                (self._key(namespace, key), time.time())
+            ).fetchone()
+            if row is None:
+                return None
+            return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning(f"Result store read failed for {namespace}: {str(e)}")
+            return None
+
+    def put(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a JSON-serializable value, replacing any previous one
+
+        Args:
+            namespace: Kind of result, e.g. "summary" or "extraction"
+            key: Cache key within the namespace
+            value: Value to store
+            ttl: Seconds until the value expires (defaults to the store's TTL)
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            payload = zlib.compress(json.dumps(value).encode("utf-8"), COMPRESSION_LEVEL)
+            self._connection().execute(
+                "INSERT OR REPLACE INTO results (key, payload, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (self._key(namespace, key), payload, now, now + (ttl if ttl is not None else self.default_ttl))
+            )
+            if now - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self.purge_expired()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Result store write failed for {namespace}: {str(e)}")
+
+    def delete(self, namespace: str, key: str):
+        """Remove a stored value if present."""
+        if not self.enabled:
+            return
+        try:
+            self._connection().execute("DELETE FROM results WHERE key = ?", (self._key(namespace, key),))
+        except sqlite3.Error as e:
+            logger.warning(f"Result store delete failed for {namespace}: {str(e)}")
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        self._last_purge = time.time()
+        try:
+            cursor = self._connection().execute("DELETE FROM results WHERE expires_at <= ?", (self._last_purge,))
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Result store purge failed: {str(e)}")
+            return 0
+
+
+# Process-wide store; the database file is shared by every worker process on the host
+result_store = ResultStore()
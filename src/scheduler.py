@@ -0,0 +1,194 @@
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Priority classes (lower value is served first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# Admission control configuration
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+MAX_QUEUE_DEPTH = int(os.getenv("LLM_MAX_QUEUE_DEPTH", "16"))
+MAX_QUEUE_WAIT_SECONDS = float(os.getenv("LLM_MAX_QUEUE_WAIT", "300"))
+SESSION_RATE_PER_MINUTE = float(os.getenv("LLM_SESSION_RATE_PER_MINUTE", "6"))
+SESSION_BURST = int(os.getenv("LLM_SESSION_BURST", "3"))
+MAX_TRACKED_SESSIONS = 1024
+CANCEL_POLL_SECONDS = 0.5
+QUEUE_WAIT_SAMPLES = 4096  # Recent queueing delays kept for load reports
+
+
+# Event set when a call made in this context is admitted, for callers that need to know
+# whether their work is still queued or already running (see prefetch)
+admission_event: contextvars.ContextVar = contextvars.ContextVar("llm_admission_event", default=None)
+
+
+class AdmissionRejected(Exception):
+    """Raised when an LLM call is refused by the scheduler."""
+
+
+class GenerationCancelled(Exception):
+    """Raised when the caller cancels an LLM call that is still waiting or retrying."""
+
+
+class _TokenBucket:
+    """Per-session token bucket used for rate limiting."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float):
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the language model
+
+    Bounds the number of concurrent LLM calls, rate-limits each session,
+    serves interactive requests before batch requests and rejects new work
+    once the wait queue is full.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENT_LLM_CALLS,
+        max_queue_depth: int = MAX_QUEUE_DEPTH,
+        max_wait: float = MAX_QUEUE_WAIT_SECONDS,
+        session_rate_per_minute: float = SESSION_RATE_PER_MINUTE,
+        session_burst: int = SESSION_BURST,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.max_wait = max_wait
+        self.session_rate = session_rate_per_minute / 60.0
+        self.session_burst = max(1, session_burst)
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._stats = {"admitted": 0, "rejected": 0, "rate_limited": 0, "timed_out": 0}
+        self._queue_waits = deque(maxlen=QUEUE_WAIT_SAMPLES)
+
+    def _prune_buckets(self, now: float):
+        """Forget sessions whose bucket would already be full again."""
+        refill_time = self.session_burst / self.session_rate
+        for session_id, bucket in list(self._buckets.items()):
+            if now - bucket.updated >= refill_time:
+                del self._buckets[session_id]
+
+    def _check_rate_limit(self, session_id: Optional[str]):
+        """Consume one token from the session's bucket or raise AdmissionRejected."""
+        if not session_id or self.session_rate <= 0:
+            return
+
+        now = time.monotonic()
+        bucket = self._buckets.get(session_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_SESSIONS:
+                self._prune_buckets(now)
+            bucket = self._buckets[session_id] = _TokenBucket(self.session_burst)
+        else:
+            bucket.tokens = min(self.session_burst, bucket.tokens + (now - bucket.updated) * self.session_rate)
+            bucket.updated = now
+
+        if bucket.tokens < 1:
+            self._stats["rate_limited"] += 1
+            retry_after = (1 - bucket.tokens) / self.session_rate
+            raise AdmissionRejected(
+                f"You are sending requests too quickly. Please wait about {retry_after:.0f} seconds and try again."
+            )
+        bucket.tokens -= 1
+
+    @contextmanager
+    def slot(
+        self,
+        priority: int = PRIORITY_INTERACTIVE,
+        session_id: Optional[str] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[None]:
+        """
+        Hold one LLM concurrency slot for the duration of the block
+
+        Args:
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BATCH
+            session_id: Identifier of the calling session, used for rate limiting
+            cancel_event: Event that abandons the wait for a slot when set
+
+        Raises:
+            AdmissionRejected: If the session is rate limited, the queue is full
+                or the wait for a slot exceeds the configured limit
+            GenerationCancelled: If cancel_event is set while waiting
+        """
+        with self._cond:
+            self._check_rate_limit(session_id)
+            queued_at = time.monotonic()
+
+            if self._active >= self.max_concurrency or self._waiting:
+                # Batch work may only fill half of the queue so interactive requests always find room
+                depth_limit = self.max_queue_depth if priority == PRIORITY_INTERACTIVE else self.max_queue_depth // 2
+                if len(self._waiting) >= depth_limit:
+                    self._stats["rejected"] += 1
+                    logger.warning(f"LLM queue full ({len(self._waiting)} waiting), rejecting request")
+                    raise AdmissionRejected(
+                        "The server is busy processing other documents. Please try again in a few minutes."
+                    )
+
+                entry = (priority, next(self._sequence))
+                heapq.heappush(self._waiting, entry)
+                deadline = time.monotonic() + self.max_wait
+                try:
+                    while self._active >= self.max_concurrency or self._waiting[0] != entry:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise GenerationCancelled("LLM call cancelled while queued")
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timed_out"] += 1
+                            raise AdmissionRejected(
+                                "Timed out waiting for the language model. Please try again later."
+                            )
+                        # Wake up periodically so cancellation is noticed without a notify
+                        self._cond.wait(min(remaining, CANCEL_POLL_SECONDS))
+                finally:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+
+            self._active += 1
+            self._stats["admitted"] += 1
+            self._queue_waits.append(time.monotonic() - queued_at)
+            admitted = admission_event.get()
+            if admitted is not None:
+                admitted.set()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of admission counters and current load."""
+        with self._cond:
+            return dict(self._stats, active=self._active, queued=len(self._waiting))
+
+    def queue_waits(self) -> List[float]:
+        """Return the seconds recent admitted calls spent waiting for a slot, oldest first."""
+        with self._cond:
+            return list(self._queue_waits)
+
+
+# Process-wide scheduler shared by every Streamlit session
+scheduler = LLMScheduler()
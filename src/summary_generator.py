@@ -1,10 +1,22 @@
 import logging
-from .llm_interface import call_ollama_api
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from .checkpoint import Checkpoint, CheckpointError
+from .chunking import SUMMARY_CHUNK_CHARS, Chunk, chunk_document
+from .document import Document, content_hash
+from .llm_interface import MODEL_NAME, call_ollama_api
+from .profiling import profiled, propagate_context
+from .result_store import result_store
+from .scheduler import AdmissionRejected, GenerationCancelled, MAX_CONCURRENT_LLM_CALLS, PRIORITY_INTERACTIVE
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Module logger (configured by the application entry point)
 logger = logging.getLogger(__name__)
 
+# Prefixes generate_summary uses for error messages returned in place of a summary
+SUMMARY_ERROR_PREFIXES = ("Error:", "Failed to generate summary:", "Summary generation was cancelled")
+
+@profiled("build_prompt")
 def generate_summary_prompt(pdf_content: str) -> str:
     """
     Create a prompt to generate a comprehensive and detailed summary of a document.
@@ -35,24 +47,182 @@ Your summary must be so detailed and comprehensive that someone could understand
 the COMPLETE content of the document without reading the original. Leave nothing important out.
 """
     return prompt
-def generate_summary(pdf_content: str) -> str:
+
+@profiled("build_prompt")
+def generate_chunk_summary_prompt(chunk_text: str) -> str:
+    """
+    Create a prompt to summarize one section of a longer document.
+    Page numbers are deliberately left out so the result can be reused when
+    the same pages move within a revised document.
+    """
+    prompt = f"""
+You are an expert document analyst. The text below is ONE SECTION of a longer document.
+Summarize this section thoroughly; other sections are summarized separately.
+
+SECTION CONTENT:
+```
+{chunk_text}
+```
+
+SUMMARY INSTRUCTIONS:
+1. Capture ALL key information, definitions, figures and examples in this section
+2. Present each point on its own line
+3. Do not add an introduction or conclusion about the document as a whole
+"""
+    return prompt
+
+@profiled("build_prompt")
+def generate_combined_summary_prompt(chunks: List[Chunk], section_summaries: List[str]) -> str:
+    """
+    Create a prompt that merges per-section summaries into one comprehensive summary.
+    """
+    sections = "\n\n".join(
+        f"SECTION {i + 1} (pages {chunk.view.first_page + 1}-{chunk.view.last_page + 1}):\n{summary}"
+        for i, (chunk, summary) in enumerate(zip(chunks, section_summaries))
+    )
+
+    prompt = f"""
+You are an expert document analyst tasked with creating a comprehensive and detailed summary.
+The document was summarized section by section; the section summaries are below in document order.
+
+SECTION SUMMARIES:
+```
+{sections}
+```
+
+SUMMARY INSTRUCTIONS:
+1. Merge the section summaries into ONE EXTREMELY DETAILED summary that captures ALL key information
+2. Present each point on its own line for maximum clarity and readability
+3. Keep information from EVERY section; remove only repetition between sections
+4. Organize the information in a logical, structured format
+
+
+Your summary must be so detailed and comprehensive that someone could understand 
+the COMPLETE content of the document without reading the original. Leave nothing important out.
+"""
+    return prompt
+
+def _summarize_incrementally(
+    document: Document,
+    session_id: Optional[str],
+    priority: int,
+    cancel_event: Optional[threading.Event],
+) -> str:
+    """
+    Summarize a long document section by section, reusing saved section summaries
+
+    Every section summary is checkpointed under the hash of the section's text
+    as soon as it is generated. A retry or a restarted process therefore only
+    generates the missing sections, and a revised version of the document only
+    sends its changed sections back to the language model. Missing sections are
+    generated concurrently, as many at once as the LLM scheduler admits. The
+    merge step always runs since its input changes.
+
+    Returns:
+        Generated summary text
+
+    Raises:
+        CheckpointError: If a section keeps failing (completed sections stay saved)
+        ValueError: If the language model returns an invalid merge response
+    """
+    chunks = [chunk for chunk in chunk_document(document) if chunk.text.strip()]
+    checkpoint = Checkpoint("chunk_summary", len(chunks))
+    rate_limit_session = session_id
+    rate_limit_lock = threading.Lock()
+
+    def summarize_chunk(chunk: Chunk) -> str:
+        nonlocal rate_limit_session
+        # The whole summary counts as one request against the session's rate limit
+        with rate_limit_lock:
+            call_session, rate_limit_session = rate_limit_session, None
+        response = call_ollama_api(
+            generate_chunk_summary_prompt(chunk.text), priority=priority,
+            session_id=call_session, cancel_event=cancel_event
+        )
+        if 'response' not in response:
+            raise ValueError("Invalid response from language model")
+        return response['response']
+
+    def summarize_section(chunk: Chunk) -> str:
+        return checkpoint.run_step(f"{MODEL_NAME}:{chunk.hash}", lambda: summarize_chunk(chunk))
+
+    workers = max(1, min(MAX_CONCURRENT_LLM_CALLS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summary") as pool:
+        section_summaries = list(pool.map(propagate_context(summarize_section), chunks))
+    logger.info(
+        f"Summarized {len(chunks) - checkpoint.reused} of {len(chunks)} sections, "
+        f"reused {checkpoint.reused} saved section summaries"
+    )
+
+    if len(section_summaries) == 1:
+        return section_summaries[0]
+
+    response = call_ollama_api(
+        generate_combined_summary_prompt(chunks, section_summaries), priority=priority,
+        session_id=rate_limit_session, cancel_event=cancel_event
+    )
+    if 'response' not in response:
+        raise ValueError("Invalid response from language model")
+    return response['response']
+
+def is_summary_error(summary: str) -> bool:
+    """Return True if generate_summary returned an error message instead of a summary."""
+    return summary.startswith(SUMMARY_ERROR_PREFIXES)
+
+def generate_summary(
+    pdf_content: str,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    cancel_event: Optional[threading.Event] = None,
+    document: Optional[Document] = None,
+) -> str:
     """
     Generate a summary from PDF content
     
     Args:
         pdf_content: Text extracted from PDF
+        session_id: Identifier of the calling session, used for rate limiting
+        priority: Scheduler priority class for the LLM call
+        cancel_event: Event that abandons generation when set
+        document: Structured document for pdf_content; long documents are then
+            summarized section by section so revisions only re-run changed pages
         
     Returns:
         Generated summary text
     """
     try:
+        # Reuse a summary produced by any worker process for the same content and model
+        cache_key = f"{MODEL_NAME}:{content_hash(pdf_content)}"
+        cached = result_store.get("summary", cache_key)
+        if cached is not None:
+            logger.info("Using cached summary")
+            return cached
+
+        if document is not None and len(document.text) > SUMMARY_CHUNK_CHARS:
+            summary = _summarize_incrementally(document, session_id, priority, cancel_event)
+            result_store.put("summary", cache_key, summary)
+            return summary
+
         prompt = generate_summary_prompt(pdf_content)
-        response = call_ollama_api(prompt)
+        response = call_ollama_api(prompt, priority=priority, session_id=session_id, cancel_event=cancel_event)
 
         if 'response' not in response:
             return "Error: Invalid response from language model"
 
+        result_store.put("summary", cache_key, response['response'])
         return response['response']
+    except AdmissionRejected as e:
+        logger.warning(f"Summary request rejected: {str(e)}")
+        return f"Error: {str(e)}"
+    except GenerationCancelled:
+        logger.info("Summary generation cancelled")
+        return "Summary generation was cancelled."
+    except CheckpointError as e:
+        logger.error(f"Summary generation stopped after {e.completed} of {e.total} sections: {str(e)}")
+        return (
+            f"Failed to generate summary: {str(e)}. {e.completed} of {e.total} sections were saved; "
+            "generate the summary again to resume where it stopped."
+        )
     except Exception as e:
         logger.error(f"Summary generation error: {str(e)}")
         return f"Failed to generate summary: {str(e)}"
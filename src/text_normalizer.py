@@ -0,0 +1,184 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+# Module logger (configured by the application entry point)
+logger = logging.getLogger(__name__)
+
+# Repeated header/footer detection
+EDGE_LINES = 2  # Lines at the top and bottom of each page considered for headers/footers
+REPEATED_LINE_MIN_PAGES = 3
+REPEATED_LINE_PAGE_RATIO = 0.5
+REPEATED_LINE_MIN_LETTERS = 4  # Shorter lines (e.g. "1.", "A") are too generic to be a running header
+
+# Rough characters-per-token ratio for English text with llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+PAGE_NUMBER_RE = re.compile(r'^(?:page\s*)?\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?$', re.IGNORECASE)
+# Page references and dates are the only parts of a running header expected to change between pages
+PAGE_REFERENCE_RE = re.compile(r'\b(?:page\s*\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?|\d{1,4}\s*(?:/|of)\s*\d{1,4})\b',
+                               re.IGNORECASE)
+DATE_RE = re.compile(r'\b\d{1,4}[./-]\d{1,2}[./-]\d{1,4}\b')
+LETTER_RE = re.compile(r'[^\W\d_]')
+HYPHEN_BREAK_RE = re.compile(r'([a-z])-\n\s*([a-z])')
+INLINE_WHITESPACE_RE = re.compile(r'[ \t\f\v\u00a0]+')
+BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of prompt tokens a piece of text will use."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _line_signature(line: str) -> str:
+    """
+    Normalize a line so running headers that only differ by page number or date compare equal
+
+    Other digits are kept, so numbered headings ("Lecture 3", "Lecture 4") stay distinct.
+    """
+    line = " ".join(line.lower().split())
+    return DATE_RE.sub("#", PAGE_REFERENCE_RE.sub("#", line))
+
+
+def _edge_line_indices(lines: List[str]) -> List[int]:
+    """Return the indices of non-empty lines near the top and bottom of a page."""
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    if len(content) <= EDGE_LINES * 2:
+        return content
+    return content[:EDGE_LINES] + content[-EDGE_LINES:]
+
+
+def _page_number_position(lines: List[str]) -> Tuple[int, int]:
+    """Return the indices of the first and last non-empty lines of a page (-1 if there are none)."""
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    return (content[0], content[-1]) if content else (-1, -1)
+
+
+def _repetition_threshold(page_count: int) -> int:
+    return max(REPEATED_LINE_MIN_PAGES, math.ceil(page_count * REPEATED_LINE_PAGE_RATIO))
+
+
+def find_repeated_lines(pages: List[List[str]]) -> set:
+    """
+    Find header/footer line signatures that repeat across many pages
+
+    Args:
+        pages: Lines of each page
+
+    Returns:
+        Set of line signatures to strip
+    """
+    if len(pages) < REPEATED_LINE_MIN_PAGES:
+        return set()
+
+    page_counts = Counter()
+    for lines in pages:
+        page_counts.update({_line_signature(lines[i]) for i in _edge_line_indices(lines)})
+
+    threshold = _repetition_threshold(len(pages))
+    return {
+        signature for signature, count in page_counts.items()
+        if count >= threshold and len(LETTER_RE.findall(signature)) >= REPEATED_LINE_MIN_LETTERS
+    }
+
+
+def find_page_number_positions(pages: List[List[str]]) -> set:
+    """
+    Find where the document prints its page numbers
+
+    A bare number is only a page number if pages consistently carry one at
+    the same position; elsewhere it may be content, such as a table's last value.
+
+    Args:
+        pages: Lines of each page
+
+    Returns:
+        Set of positions ("first", "last") holding page numbers
+    """
+    if len(pages) < REPEATED_LINE_MIN_PAGES:
+        return set()
+
+    counts = Counter()
+    for lines in pages:
+        first, last = _page_number_position(lines)
+        if first >= 0 and PAGE_NUMBER_RE.match(lines[first].strip()):
+            counts["first"] += 1
+        if last >= 0 and PAGE_NUMBER_RE.match(lines[last].strip()):
+            counts["last"] += 1
+
+    threshold = _repetition_threshold(len(pages))
+    return {position for position, count in counts.items() if count >= threshold}
+
+
+def normalize_text(text: str) -> str:
+    """Rejoin hyphenated line breaks and collapse whitespace runs."""
+    text = HYPHEN_BREAK_RE.sub(r'\1\2', text)
+    text = INLINE_WHITESPACE_RE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    text = BLANK_LINES_RE.sub("\n\n", text)
+    return text.strip()
+
+
+def normalize_pages(pages: List[str]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Clean extracted page text before it is used in prompts
+
+    Strips repeated running headers/footers (keeping their first occurrence)
+    and page numbers printed at a consistent position, rejoins words split
+    by hyphenated line breaks and collapses whitespace.
+
+    Args:
+        pages: Raw extracted text for each page
+
+    Returns:
+        Tuple containing:
+            - Normalized text for each page
+            - Statistics including the estimated number of tokens saved
+    """
+    page_lines = [page.split("\n") for page in pages]
+    repeated = find_repeated_lines(page_lines)
+    page_number_positions = find_page_number_positions(page_lines)
+
+    removed_lines = 0
+    seen_repeated = set()
+    normalized = []
+    for lines in page_lines:
+        edges = set(_edge_line_indices(lines))
+        first, last = _page_number_position(lines)
+        page_number_lines = {
+            index for position, index in (("first", first), ("last", last))
+            if position in page_number_positions and index >= 0
+        }
+        kept = []
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if i in page_number_lines and PAGE_NUMBER_RE.match(stripped):
+                removed_lines += 1
+                continue
+            if i in edges:
+                signature = _line_signature(stripped)
+                if signature in repeated:
+                    # Keep the first occurrence so a document title is not lost entirely
+                    if signature in seen_repeated:
+                        removed_lines += 1
+                        continue
+                    seen_repeated.add(signature)
+            kept.append(line)
+        normalized.append(normalize_text("\n".join(kept)))
+
+    tokens_before = sum(estimate_tokens(page) for page in pages)
+    tokens_after = sum(estimate_tokens(page) for page in normalized)
+    stats = {
+        "repeated_lines": len(repeated),
+        "lines_removed": removed_lines,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+    }
+    logger.info(
+        f"Normalization removed {removed_lines} header/footer lines and saved ~{stats['tokens_saved']} "
+        f"of {tokens_before} tokens"
+    )
+    return normalized, stats
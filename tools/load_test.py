@@ -0,0 +1,682 @@
+"""
+Load test for the summary and quiz generation pipeline.
+
+Starts a mock Ollama server with configurable token latency, then runs N
+concurrent simulated sessions at each concurrency level. Each session asks
+for a summary, a quiz from the question bank, the answer explanations and a
+second quiz, and the test reports queueing delay in the LLM scheduler,
+latency percentiles per operation, error rates and Python heap per session.
+
+By default the sessions call the entry points the app calls for each button
+click. With --app the test starts app.py with `streamlit run` and each session
+talks to it over Streamlit's websocket like a browser would: it uploads a
+generated PDF, clicks the summary and quiz buttons, submits the quiz and asks
+for a new one. The scheduler then lives in the server process, so queueing
+delay is not reported and memory is the growth of the server's resident set.
+
+Without --app, heap usage is measured in a second, untimed pass of the same
+workload, since tracing allocations slows the pipeline down.
+
+Usage:
+    python tools/load_test.py --sessions 1,10,50
+    python tools/load_test.py --sessions 10 --app
+    python tools/load_test.py --sessions 50 --llm-concurrency 4 --json report.json
+    python tools/load_test.py --sessions 20 --backends 2 --slow-fraction 0.1 --slow-factor 8
+    python tools/load_test.py --ollama-url http://gpu-box:11434 --sessions 5
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHARS_PER_TOKEN = 4
+SERVER_START_TIMEOUT = 10.0
+APP_START_TIMEOUT = 60.0
+
+SUMMARY_PARAGRAPH = (
+    "The document explains how the system is organised, which trade-offs the authors made and "
+    "why the chosen design scales to larger inputs. Key results are compared against earlier work. "
+)
+
+DOCUMENT_PARAGRAPH = (
+    "Section {section} of document {document} describes measurement {value} in detail, including the "
+    "experimental setup, the observed behaviour under load and the limitations of the approach. "
+)
+
+
+# --------------------------------------------------------------------------- mock Ollama server
+
+def _mock_quiz_response(num_questions: int = 10, explained: bool = True) -> str:
+    questions = []
+    for number in range(1, num_questions + 1):
+        options = [f"Answer {number}{letter}" for letter in "ABCD"]
+        question = {
+            "question": f"Which statement about topic {number} is supported by the document?",
+            "options": options,
+            "correctAnswer": options[number % 4],
+        }
+        if explained:
+            question["explanation"] = f"The document states this directly in its discussion of topic {number}."
+        questions.append(question)
+    return "```json\n" + json.dumps({"questions": questions}, indent=2) + "\n```"
+
+
+def _mock_explanations_response(prompt: str) -> str:
+    count = prompt.count("Correct answer:")
+    explanations = [{"number": number, "explanation": "The document states this directly."}
+                    for number in range(1, count + 1)]
+    return "```json\n" + json.dumps({"explanations": explanations}, indent=2) + "\n```"
+
+
+def _mock_summary_response(chars: int = 1500) -> str:
+    return "## Summary\n\n" + (SUMMARY_PARAGRAPH * (chars // len(SUMMARY_PARAGRAPH) + 1))[:chars]
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate and /api/tags with canned content at a simulated token rate."""
+
+    server_version = "MockOllama/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body: Dict[str, Any], status: int = 200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.model}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = request.get("prompt", "")
+        if "multiple-choice quiz" in prompt:
+            text = _mock_quiz_response(explained='"explanation"' in prompt)
+        elif "Correct answer:" in prompt:
+            text = _mock_explanations_response(prompt)
+        else:
+            text = _mock_summary_response()
+
+        config = self.server.config
+        slowdown = config.slow_factor if random.random() < config.slow_fraction else 1.0
+        first_token = config.first_token_seconds * slowdown
+        per_token = config.token_seconds * slowdown
+        tokens = [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+        # Like Ollama, only a few requests are decoded at once; the rest wait for the GPU
+        with self.server.gpu:
+            time.sleep(first_token)
+            if not request.get("stream", True):
+                time.sleep(per_token * len(tokens))
+                self._send_json({"model": request.get("model"), "response": text, "done": True})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            try:
+                for token in tokens:
+                    self.wfile.write(json.dumps({"response": token, "done": False}).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                    time.sleep(per_token)
+                self.wfile.write(json.dumps({"response": "", "done": True}).encode("utf-8") + b"\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client cancelled the stream
+
+
+def serve_mock(args: argparse.Namespace):
+    """Run the mock Ollama server in the foreground."""
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockOllamaHandler)
+    server.daemon_threads = True
+    server.config = args
+    server.model = args.model
+    server.gpu = threading.BoundedSemaphore(args.mock_parallel)
+    print(f"Mock Ollama listening on http://127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_mock_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Start the mock server in its own process so it does not compete for the GIL."""
+    port = _free_port()
+    command = [
+        sys.executable, os.path.abspath(__file__), "--serve-mock", "--port", str(port),
+        "--model", args.model, "--mock-parallel", str(args.mock_parallel),
+        "--first-token-ms", str(args.first_token_ms), "--token-ms", str(args.token_ms),
+        "--slow-fraction", str(args.slow_fraction), "--slow-factor", str(args.slow_factor),
+    ]
+    process = subprocess.Popen(command)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/api/tags", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock Ollama server did not start")
+
+
+# --------------------------------------------------------------------------- load generation
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def synthetic_pages(document_index: Any, pages: int, chars_per_page: int) -> List[str]:
+    """Build distinct page texts so sessions do not share cached results."""
+    result = []
+    for page in range(pages):
+        paragraph = DOCUMENT_PARAGRAPH.format(section=page + 1, document=document_index, value=page * 7 + 3)
+        result.append((paragraph * (chars_per_page // len(paragraph) + 1))[:chars_per_page])
+    return result
+
+
+def synthetic_pdf(pages: List[str], line_chars: int = 90) -> bytes:
+    """Write the page texts into a minimal PDF with one Helvetica text block per page."""
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    pages_id = 2 + 2 * len(pages)
+    page_ids = []
+    for text in pages:
+        lines = [text[i:i + line_chars] for i in range(0, len(text), line_chars)]
+        escaped = (line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines)
+        stream = ("BT /F1 9 Tf 40 760 Td 11 TL " + " ".join(f"({line}) '" for line in escaped) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 1 0 R >> >> >>" % (pages_id, len(objects)))
+        page_ids.append(len(objects))
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>"
+                   % (b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    return data
+
+
+def _document_index(sessions: int, index: int, args: argparse.Namespace) -> Any:
+    return 0 if args.shared_document else f"{sessions}-{index}-{time.time_ns()}"
+
+
+def pipeline_session(sessions: int, args: argparse.Namespace) -> Callable[[int], Iterator[Tuple[str, Callable]]]:
+    """Return a session factory that calls the pipeline's entry points directly."""
+    from src.document import build_document
+    from src.question_bank import generate_quiz_from_bank
+    from src.quiz_generator import generate_explanations
+    from src.summary_generator import generate_summary, is_summary_error
+
+    documents = [build_document(synthetic_pages(_document_index(sessions, index, args), args.pages,
+                                                args.chars_per_page)) for index in range(sessions)]
+
+    def session(index: int) -> Iterator[Tuple[str, Callable]]:
+        session_id = f"load-{sessions}-{index}"
+        document = documents[index]
+        quiz = {}
+
+        def summary():
+            result = generate_summary(document.text, session_id=session_id, document=document)
+            return result if is_summary_error(result) else None
+
+        def new_quiz():
+            quiz.update(generate_quiz_from_bank(document.text, session_id=session_id))
+            return quiz.get("error")
+
+        def explanations():
+            missing = [q for q in quiz.get("questions", []) if not q.get("explanation")]
+            if not missing:
+                return None
+            return generate_explanations(document.text, missing).get("error")  # Not rate limited, as in the app
+
+        yield "summary", summary
+        yield "quiz", new_quiz
+        yield "explanations", explanations
+        yield "new_quiz", new_quiz
+
+    return session
+
+
+class AppClient:
+    """
+    One browser session of a running Streamlit server, spoken to over its websocket
+
+    Widgets are found by their key, which Streamlit appends to the widget id.
+    Like the browser, the client resends the values of stateful widgets (the
+    uploaded file, the quiz answers) on every rerun and button clicks once.
+    """
+
+    def __init__(self, url: str, websocket, timeout: float):
+        self.url = url
+        self.websocket = websocket
+        self.timeout = timeout
+        self.session_id: Optional[str] = None
+        self.elements: Dict[Tuple[int, ...], Any] = {}
+        self.widget_states: Dict[str, Any] = {}
+        self._request_ids = itertools.count(1)
+
+    def _receive(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = ForwardMsg()
+        message.ParseFromString(self.websocket.recv(timeout=self.timeout))
+        return message
+
+    def _send(self, message):
+        self.websocket.send(message.SerializeToString())
+
+    def rerun(self, clicked: Optional[str] = None):
+        """Rerun the script, optionally clicking the button with this key, and wait for it to finish."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.SetInParent()
+        message.rerun_script.widget_states.widgets.extend(self.widget_states.values())
+        if clicked is not None:
+            message.rerun_script.widget_states.widgets.add(id=self.widget_id("button", clicked), trigger_value=True)
+        self._send(message)
+        while True:
+            reply = self._receive()
+            kind = reply.WhichOneof("type")
+            if kind == "new_session":
+                # Also sent when the script calls st.rerun()
+                self.session_id = reply.new_session.initialize.session_id
+                self.elements = {}
+            elif kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+                self.elements[tuple(reply.metadata.delta_path)] = reply.delta.new_element
+            elif kind == "script_finished" and reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def find(self, kind: str) -> List[Any]:
+        """Return the widgets or elements of this kind from the last run, in page order."""
+        return [getattr(element, kind) for _, element in sorted(self.elements.items())
+                if element.WhichOneof("type") == kind]
+
+    def widget_id(self, kind: str, key: str) -> str:
+        for widget in self.find(kind):
+            if widget.id.endswith(f"-{key}"):
+                return widget.id
+        raise LookupError(f"No {kind} with key {key!r} on the page")
+
+    def upload(self, name: str, data: bytes):
+        """Upload a file through the page's file uploader and rerun."""
+        import requests
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import UploadedFileInfo
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        message = BackMsg()
+        message.file_urls_request.request_id = str(next(self._request_ids))
+        message.file_urls_request.session_id = self.session_id
+        message.file_urls_request.file_names.append(name)
+        self._send(message)
+        while True:
+            reply = self._receive()
+            if reply.WhichOneof("type") == "file_urls_response":
+                break
+        if reply.file_urls_response.error_msg:
+            raise RuntimeError(reply.file_urls_response.error_msg)
+        urls = reply.file_urls_response.file_urls[0]
+        upload_url = self.url + urls.upload_url if urls.upload_url.startswith("/") else urls.upload_url
+        requests.put(upload_url, files={"file": (name, data, "application/pdf")}, timeout=self.timeout).raise_for_status()
+
+        state = WidgetState(id=self.find("file_uploader")[0].id)
+        state.file_uploader_state_value.uploaded_file_info.append(
+            UploadedFileInfo(name=name, size=len(data), file_id=urls.file_id, file_urls=urls))
+        self.widget_states[state.id] = state
+        self.rerun()
+
+    def answer_quiz(self):
+        """Pick the first option of every quiz question and submit the form."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        answers = [WidgetState(id=radio.id, int_value=0) for radio in self.find("radio")
+                   if radio.form_id == "quiz_form"]
+        self.widget_states.update((answer.id, answer) for answer in answers)
+        self.rerun(clicked="FormSubmitter:quiz_form-Submit Quiz")
+        for answer in answers:
+            del self.widget_states[answer.id]  # The form is gone once submitted
+
+    def problem(self) -> Optional[str]:
+        """Return the first error the last run showed, if any."""
+        from streamlit.proto.Alert_pb2 import Alert
+
+        for exception in self.find("exception"):
+            return f"{exception.type}: {exception.message}"
+        for alert in self.find("alert"):
+            # Wrong answers are shown as errors too; failed explanations only as a warning
+            if alert.format == Alert.ERROR and not alert.body.startswith("✗"):
+                return alert.body
+            if alert.format == Alert.WARNING and alert.body.startswith("Explanations are not available"):
+                return alert.body
+        return None
+
+
+def start_app_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Start app.py with `streamlit run`; it inherits the pipeline configuration from the environment."""
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "streamlit", "run", os.path.join(REPO_ROOT, "app.py"),
+        "--server.headless", "true", "--server.port", str(port), "--server.enableXsrfProtection", "false",
+        "--browser.gatherUsageStats", "false",
+    ]
+    log_path = os.path.join(tempfile.mkdtemp(prefix="pdfq-app-"), "streamlit.log")
+    with open(log_path, "wb") as log_file:
+        process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT, cwd=REPO_ROOT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + APP_START_TIMEOUT
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            urllib.request.urlopen(f"{url}/_stcore/health", timeout=1).read()
+            print(f"Streamlit app listening on {url} (log: {log_path})", flush=True)
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Streamlit app did not start, see {log_path}")
+
+
+def resident_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process, where /proc is available."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def app_session(sessions: int, args: argparse.Namespace) -> Callable[[int], Iterator[Tuple[str, Callable]]]:
+    """Return a session factory that clicks through the running app like a browser."""
+    uploads = [synthetic_pdf(synthetic_pages(_document_index(sessions, index, args), args.pages,
+                                             args.chars_per_page)) for index in range(sessions)]
+
+    def session(index: int) -> Iterator[Tuple[str, Callable]]:
+        from websockets.sync.client import connect
+
+        with connect(args.app_url.replace("http", "ws", 1) + "/_stcore/stream", subprotocols=["streamlit"],
+                     max_size=None, open_timeout=SERVER_START_TIMEOUT) as websocket:
+            client = AppClient(args.app_url, websocket, args.app_timeout)
+
+            def step(action: Callable[[], Any]) -> Callable[[], Optional[str]]:
+                def run():
+                    action()
+                    return client.problem()
+                return run
+
+            yield "load", step(client.rerun)
+            yield "upload", step(lambda: client.upload(f"load-{sessions}-{index}.pdf", uploads[index]))
+            yield "summary", step(lambda: client.rerun(clicked="gen_summary"))
+            yield "quiz", step(lambda: client.rerun(clicked="gen_quiz"))
+            yield "explanations", step(client.answer_quiz)
+            yield "new_quiz", step(lambda: client.rerun(clicked="new_quiz"))
+
+    return session
+
+
+def run_sessions(sessions: int, args: argparse.Namespace) -> Tuple[Dict[str, List[float]], Counter, int, float]:
+    """Run the sessions concurrently and return latencies, errors, operation count and wall time."""
+    make_session = (app_session if args.app else pipeline_session)(sessions, args)
+    latencies: Dict[str, List[float]] = {}
+    errors = Counter()
+    operations = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(sessions)
+
+    def session(index: int):
+        barrier.wait()
+        if args.ramp_seconds:
+            time.sleep(args.ramp_seconds * index / sessions)
+        for operation, step in make_session(index):
+            started = time.perf_counter()
+            try:
+                error = step()
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            elapsed = time.perf_counter() - started
+            with lock:
+                operations[0] += 1
+                if error:
+                    errors[f"{operation}: {error[:80]}"] += 1
+                else:
+                    latencies.setdefault(operation, []).append(elapsed)
+            if error:
+                break  # Later steps depend on this one
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(index,), daemon=True) for index in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, operations[0], time.perf_counter() - started
+
+
+def run_level(sessions: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one concurrency level and return its report."""
+    from src import llm_interface
+    from src.scheduler import LLMScheduler
+
+    # A fresh scheduler per level keeps its counters and queue samples separate; the hedger keeps its
+    # first-token history across levels, so its counters are reported as differences. With --app both
+    # live in the server process, which only exposes its memory.
+    level_scheduler = LLMScheduler(max_concurrency=args.llm_concurrency, max_queue_depth=args.queue_depth)
+    llm_interface.scheduler = level_scheduler
+    hedge_before = llm_interface.hedger.stats()
+    rss_before = resident_bytes(args.app_process.pid) if args.app else None
+
+    latencies, errors, operations, wall_seconds = run_sessions(sessions, args)
+    waits = [] if args.app else level_scheduler.queue_waits()
+    hedge_after = llm_interface.hedger.stats()
+
+    heap_bytes = None
+    if args.app:
+        rss_after = resident_bytes(args.app_process.pid)
+        if rss_before is not None and rss_after is not None:
+            heap_bytes = rss_after - rss_before
+    elif args.memory:
+        # Same workload on fresh documents, untimed, so allocation tracing does not skew the latencies
+        llm_interface.scheduler = LLMScheduler(max_concurrency=args.llm_concurrency, max_queue_depth=args.queue_depth)
+        tracemalloc.start()
+        run_sessions(sessions, args)
+        _, heap_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    failed = sum(errors.values())
+    report = {
+        "sessions": sessions,
+        "driver": "app" if args.app else "pipeline",
+        "operations": operations,
+        "errors": failed,
+        "error_rate": failed / operations if operations else 0.0,
+        "error_kinds": dict(errors.most_common()),
+        "wall_seconds": wall_seconds,
+        "throughput_per_minute": (operations - failed) / wall_seconds * 60,
+        "queue_wait": {name: percentile(waits, fraction) for name, fraction in
+                       (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))},
+        # Peak Python heap in the untimed pass, or growth of the app server's resident memory with --app
+        "heap_per_session_kib": None if heap_bytes is None else heap_bytes / sessions / 1024,
+        "latency": {operation: {name: percentile(values, fraction) for name, fraction in
+                                (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))}
+                    for operation, values in latencies.items()},
+    }
+    if not args.app:
+        report["scheduler"] = level_scheduler.stats()
+        if llm_interface.OLLAMA_HEDGE_API_URLS:
+            hedging = {name: hedge_after[name] - hedge_before[name]
+                       for name in ("calls", "hedged", "hedge_wins", "budget_exhausted", "errors")}
+            hedging["hedge_rate"] = hedging["hedged"] / hedging["calls"] if hedging["calls"] else 0.0
+            hedging["hedge_win_rate"] = hedging["hedge_wins"] / hedging["hedged"] if hedging["hedged"] else 0.0
+            report["hedging"] = hedging
+    return report
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def print_report(reports: List[Dict[str, Any]]):
+    header = (f"{'sessions':>8} {'errors':>7} {'queue p50':>9} {'queue p99':>9} {'ops/min':>7} {'KiB/sess':>8}")
+    print(header)
+    print("-" * len(header))
+    for report in reports:
+        heap = report["heap_per_session_kib"]
+        print(f"{report['sessions']:>8} {report['error_rate']:>6.0%} "
+              f"{_format_seconds(report['queue_wait']['p50']):>9} {_format_seconds(report['queue_wait']['p99']):>9} "
+              f"{report['throughput_per_minute']:>7.1f} {'-' if heap is None else f'{heap:.0f}':>8}")
+    print()
+    header = f"{'sessions':>8} {'operation':<13} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}"
+    print(header)
+    print("-" * len(header))
+    for report in reports:
+        for operation, latency in report["latency"].items():
+            print(f"{report['sessions']:>8} {operation:<13} " + " ".join(
+                f"{_format_seconds(latency[name]):>7}" for name in ("p50", "p95", "p99", "max")))
+    for report in reports:
+        if "hedging" in report:
+            hedging = report["hedging"]
+            print(f"  [{report['sessions']} sessions] hedged {hedging['hedged']}/{hedging['calls']} calls "
+                  f"({hedging['hedge_rate']:.0%}), duplicate won {hedging['hedge_win_rate']:.0%}")
+        for kind, count in report["error_kinds"].items():
+            print(f"  [{report['sessions']} sessions] {count}x {kind}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,5,10", help="Comma-separated concurrency levels")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per synthetic document")
+    parser.add_argument("--chars-per-page", type=int, default=2000, help="Characters per synthetic page")
+    parser.add_argument("--shared-document", action="store_true",
+                        help="Give every session the same document so the result store is exercised")
+    parser.add_argument("--app", action="store_true",
+                        help="Start app.py with `streamlit run` and drive it over HTTP instead of calling the pipeline")
+    parser.add_argument("--app-timeout", type=float, default=600.0, help="Seconds one app rerun may take")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip the untimed pass that measures heap usage per session")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="Spread session starts over this period")
+    parser.add_argument("--llm-concurrency", type=int, default=int(os.getenv("LLM_MAX_CONCURRENCY", "2")),
+                        help="Scheduler concurrency slots")
+    parser.add_argument("--queue-depth", type=int, default=int(os.getenv("LLM_MAX_QUEUE_DEPTH", "16")),
+                        help="Scheduler queue depth")
+    parser.add_argument("--ollama-url", help="Use an existing Ollama server instead of the mock")
+    parser.add_argument("--json", dest="json_path", help="Also write the reports to this file")
+    parser.add_argument("--log-level", default="critical", help="Log level for the pipeline's own messages")
+    mock = parser.add_argument_group("mock server")
+    mock.add_argument("--model", default="llama3:latest")
+    mock.add_argument("--first-token-ms", type=float, default=200.0, help="Delay before the first token")
+    mock.add_argument("--token-ms", type=float, default=10.0, help="Delay per generated token")
+    mock.add_argument("--backends", type=int, default=1,
+                      help="Mock servers to start; the extra ones receive hedged duplicates")
+    mock.add_argument("--mock-parallel", type=int, default=4, help="Requests the mock decodes at once")
+    mock.add_argument("--slow-fraction", type=float, default=0.05, help="Share of requests that are slowed down")
+    mock.add_argument("--slow-factor", type=float, default=4.0, help="Slowdown of those requests")
+    mock.add_argument("--serve-mock", action="store_true", help=argparse.SUPPRESS)
+    mock.add_argument("--port", type=int, default=11434, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.first_token_seconds = args.first_token_ms / 1000
+    args.token_seconds = args.token_ms / 1000
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.serve_mock:
+        serve_mock(args)
+        return
+
+    processes = []
+    if args.ollama_url:
+        ollama_url = args.ollama_url.rstrip("/")
+    else:
+        mock_urls = []
+        for _ in range(max(1, args.backends)):
+            process, url = start_mock_server(args)
+            processes.append(process)
+            mock_urls.append(url)
+        ollama_url = mock_urls[0]
+        if len(mock_urls) > 1:
+            os.environ["OLLAMA_HEDGE_HOSTS"] = ",".join(mock_urls[1:])
+
+    # Configure the pipeline before it is imported: target server, LLM concurrency (also sizes the
+    # summary and corpus worker pools) and a private result store
+    os.environ["OLLAMA_HOST"] = ollama_url
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    os.environ["LLM_MAX_QUEUE_DEPTH"] = str(args.queue_depth)
+    os.environ.setdefault("RESULT_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="pdfq-load-"), "results.sqlite3"))
+    sys.path.insert(0, REPO_ROOT)
+
+    logging.basicConfig(level=args.log_level.upper())
+
+    try:
+        # Also warms up lazily imported modules so they do not count towards session memory
+        from src.llm_interface import check_ollama_status
+        reachable, models = check_ollama_status()
+        if not reachable:
+            raise SystemExit(f"Ollama is not reachable at {ollama_url}")
+        logging.getLogger(__name__).info(f"Models available: {', '.join(models)}")
+        if args.app:
+            args.app_process, args.app_url = start_app_server(args)
+            processes.append(args.app_process)
+
+        reports = []
+        for sessions in (int(level) for level in args.sessions.split(",")):
+            print(f"Running {sessions} concurrent {'app' if args.app else 'pipeline'} sessions "
+                  f"against {args.app_url if args.app else ollama_url} ...", flush=True)
+            reports.append(run_level(sessions, args))
+        print()
+        print_report(reports)
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as report_file:
+                json.dump(reports, report_file, indent=2)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
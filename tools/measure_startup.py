@@ -0,0 +1,77 @@
+"""
+Measure how long it takes to import the core pipeline in a fresh interpreter.
+
+Worker processes and batch jobs only need the `src` package, so importing it
+must stay cheap and must not pull in the Streamlit UI or heavy PDF/HTTP
+libraries. Exits with status 1 if the median import time exceeds the target
+or a forbidden module is loaded.
+
+Usage:
+    python tools/measure_startup.py [--target 0.3] [--runs 5] [module ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["src.summary_generator", "src.quiz_generator", "src.question_bank", "src.pdf_processor"]
+DEFAULT_TARGET_SECONDS = 0.3
+FORBIDDEN_MODULES = ["streamlit", "PyPDF2", "requests", "pypdfium2", "pdfminer"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(modules, runs):
+    """Import the modules in fresh interpreters and return (timings, forbidden modules seen)."""
+    probe = PROBE.format(forbidden=FORBIDDEN_MODULES)
+    timings, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", probe, *modules],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return timings, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET_SECONDS, help="Maximum median seconds")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to sample")
+    args = parser.parse_args()
+
+    timings, loaded = measure(args.modules, args.runs)
+    median = statistics.median(timings)
+    print(f"Imported {', '.join(args.modules)}")
+    print(f"  median {median * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms over {args.runs} runs "
+          f"(target {args.target * 1000:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"  FAIL: heavy or UI modules loaded at import time: {', '.join(sorted(loaded))}")
+        failed = True
+    if median > args.target:
+        print("  FAIL: start-up is above target")
+        failed = True
+    if not failed:
+        print("  OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ UI package for the PDF Quiz & Summary Generator application.
 This package contains components and styles for the Streamlit-based user interface.
 """
 
-from src.ui.components import (
+from .components import (
     header,
     file_uploader,
     content_preview,
@@ -16,8 +16,9 @@ from src.ui.components import (
     display_ollama_status
 )
 
-from src.ui.styles import (
+from .styles import (
     apply_all_styles,
+    apply_styles,
     theme_color_palette,
     apply_custom_styles,
     apply_dark_mode,
@@ -40,6 +41,7 @@ __all__ = [
     
     # Styles
     'apply_all_styles',
+    'apply_styles',
     'theme_color_palette',
     'apply_custom_styles',
     'apply_dark_mode',
@@ -43,9 +43,15 @@ def content_preview(content: str):
 def tabs_interface(
     summary_callback: Callable,
     quiz_callback: Callable,
-    has_pdf_content: bool
+    has_pdf_content: bool,
+    new_quiz_callback: Optional[Callable[[], Dict[str, Any]]] = None
 ):
-    """Render the tabbed interface for summary and quiz."""
+    """
+    Render the tabbed interface for summary and quiz.
+
+    new_quiz_callback returns a fresh quiz, e.g. one drawn with
+    generate_quiz_from_bank; the "Create New Quiz" button is only shown when it is given.
+    """
     tab1, tab2 = st.tabs([" Summary", " Quiz"])
     
     with tab1:
@@ -65,17 +71,12 @@ def tabs_interface(
                 quiz_callback()
                 
             # Create new quiz button
-            if "quiz_data" in st.session_state and st.session_state.quiz_data:
+            if new_quiz_callback and st.session_state.get("quiz_data"):
                 if st.button("🔄 Create New Quiz", key="new_quiz"):
-                    # Clear previous quiz data to force regeneration
-                    st.session_state.quiz_data = None
-                    st.session_state.quiz_submitted = False
-                    st.session_state.user_answers = []
-                    st.session_state.score = 0
-                    
-                    # Regenerate quiz
                     with st.spinner("Generating new quiz questions..."):
-                        quiz_callback(force_new=True)
+                        st.session_state.quiz_data = new_quiz_callback()
+                    _reset_quiz_answers(len(st.session_state.quiz_data.get("questions", [])))
+                    st.rerun()
         else:
             st.warning("Please upload a PDF document first to generate a quiz.")
 
@@ -89,8 +90,64 @@ def display_summary(summary_text: str):
         st.code(summary_text)
         st.success("Summary copied to clipboard! (Use Ctrl+C to copy the text above)")
 
-def display_interactive_quiz(quiz_data: Dict[str, Any]):
-    """Display the interactive quiz on the Streamlit interface."""
+def _fragment(func: Callable) -> Callable:
+    """Run a component as an isolated fragment when the Streamlit version supports it."""
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(func) if fragment else func
+
+def _reset_quiz_answers(question_count: int):
+    """Clear answers, score and radio selections so the quiz can be taken again."""
+    st.session_state.quiz_submitted = False
+    st.session_state.user_answers = [""] * question_count
+    st.session_state.score = 0
+    st.session_state.explanations_requested = False
+    st.session_state.explanation_error = None
+    for i in range(question_count):
+        st.session_state.pop(f"q_{i}", None)
+
+def _retry_explanations():
+    """Request the explanations again after a failed attempt."""
+    st.session_state.explanations_requested = False
+    st.session_state.explanation_error = None
+
+def _fill_missing_explanations(
+    questions: List[Dict[str, Any]],
+    explain_answers: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+    wrong_only: bool
+) -> Optional[str]:
+    """Generate the explanations the quiz was created without, in one batched call."""
+    answers = st.session_state.user_answers
+    pending = [
+        i for i, q in enumerate(questions)
+        if not q.get("explanation") and not (wrong_only and answers[i] == q["correctAnswer"])
+    ]
+    if not pending:
+        return None
+
+    with st.spinner("Writing explanations..."):
+        result = explain_answers([questions[i] for i in pending])
+    if "error" in result:
+        return result["error"]
+
+    for i, explanation in zip(pending, result["explanations"]):
+        if explanation:
+            questions[i]["explanation"] = explanation
+    return None
+
+@_fragment
+def display_interactive_quiz(
+    quiz_data: Dict[str, Any],
+    explain_answers: Optional[Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = None,
+    explain_wrong_only: bool = False
+):
+    """
+    Display the interactive quiz on the Streamlit interface.
+
+    The quiz runs as a fragment and collects answers in a form, so selecting
+    an option does not rerun anything and submitting reruns only the quiz.
+    Questions generated without explanations get them from explain_answers
+    once the quiz is submitted (only for wrong answers if explain_wrong_only).
+    """
     if "error" in quiz_data:
         st.error(quiz_data["error"])
         return
@@ -117,7 +174,10 @@ def display_interactive_quiz(quiz_data: Dict[str, Any]):
 
     # Function to handle the submit button click
     def submit_quiz():
+        st.session_state.user_answers = [st.session_state.get(f"q_{i}") or "" for i in range(len(questions))]
         st.session_state.quiz_submitted = True
+        st.session_state.explanations_requested = False
+        st.session_state.explanation_error = None
         # Calculate score
         correct_count = 0
         for i, q in enumerate(questions):
@@ -125,81 +185,74 @@ def display_interactive_quiz(quiz_data: Dict[str, Any]):
                 correct_count += 1
         st.session_state.score = correct_count
 
-    # Display all questions
-    for i, q in enumerate(questions):
-        question_container = st.container()
-        with question_container:
-            st.subheader(f"Question {i+1}")
-            st.write(q["question"])
-
-            # Create radio buttons for each question
-            try:
-                # Only try to get index if the user has actually selected something
-                if st.session_state.user_answers[i] and st.session_state.user_answers[i] in q["options"]:
-                    index = q["options"].index(st.session_state.user_answers[i])
-                else:
-                    index = None
-                    
-                option_selected = st.radio(
+    if not st.session_state.quiz_submitted:
+        with st.form("quiz_form"):
+            for i, q in enumerate(questions):
+                st.subheader(f"Question {i+1}")
+                if q.get("source"):
+                    st.caption(f"From {q['source']}")
+                st.write(q["question"])
+
+                # Only preselect an option if the user has actually chosen one
+                answer = st.session_state.user_answers[i]
+                index = q["options"].index(answer) if answer and answer in q["options"] else None
+
+                st.radio(
                     f"Select your answer for question {i+1}:",
                     q["options"],
                     key=f"q_{i}",
                     index=index,
-                    disabled=st.session_state.quiz_submitted,
-                    horizontal=True
-                )
-            except (ValueError, IndexError):
-                # Fallback in case of any error
-                option_selected = st.radio(
-                    f"Select your answer for question {i+1}:",
-                    q["options"],
-                    key=f"q_{i}",
-                    index=None,
-                    disabled=st.session_state.quiz_submitted,
                     horizontal=True
                 )
-            
-            # Store user's selection in session state
-            st.session_state.user_answers[i] = option_selected
-            
-            # If the quiz has been submitted, show if the answer was correct and the explanation
-            if st.session_state.quiz_submitted:
-                is_correct = option_selected == q["correctAnswer"]
-                if is_correct:
-                    st.success("✓ Correct!")
-                else:
-                    st.error(f"✗ Incorrect. The correct answer is: {q['correctAnswer']}")
-                
-                st.info(f"Explanation: {q['explanation']}")
-            
-            st.divider()
+                st.divider()
 
-    # Submit button
-    if not st.session_state.quiz_submitted:
-        st.button("Submit Quiz", on_click=submit_quiz, type="primary")
-    else:
-        # Display final score
-        score_percentage = (st.session_state.score / len(questions)) * 100
-        st.metric(
-            label="Your Score", 
-            value=f"{st.session_state.score}/{len(questions)}", 
-            delta=f"{score_percentage:.1f}%"
-        )
-        
-        # Feedback based on score
-        if score_percentage >= 80:
-            st.success("🎉 Excellent! You've mastered this content.")
-        elif score_percentage >= 60:
-            st.info("👍 Good job! You understand most of the material.")
+            st.form_submit_button("Submit Quiz", on_click=submit_quiz, type="primary")
+        return
+
+    # Explanations are requested once per submission, even if some come back empty; a failed request can be retried
+    if explain_answers is not None and not st.session_state.get("explanations_requested"):
+        st.session_state.explanations_requested = True
+        st.session_state.explanation_error = _fill_missing_explanations(questions, explain_answers, explain_wrong_only)
+    if st.session_state.get("explanation_error"):
+        st.warning(f"Explanations are not available right now: {st.session_state.explanation_error}")
+        st.button("Retry Explanations", on_click=_retry_explanations)
+
+    # Show each answer with feedback and the explanation
+    for i, q in enumerate(questions):
+        st.subheader(f"Question {i+1}")
+        if q.get("source"):
+            st.caption(f"From {q['source']}")
+        st.write(q["question"])
+
+        answer = st.session_state.user_answers[i]
+        st.write(f"**Your answer:** {answer or 'No answer'}")
+        if answer == q["correctAnswer"]:
+            st.success("✓ Correct!")
         else:
-            st.warning("📚 Keep studying! You might want to review the summary again.")
-        
-        # Restart button
-        if st.button("Restart Quiz"):
-            st.session_state.quiz_submitted = False
-            st.session_state.user_answers = [""] * len(questions)
-            st.session_state.score = 0
-            st.rerun()
+            st.error(f"✗ Incorrect. The correct answer is: {q['correctAnswer']}")
+
+        if q.get("explanation"):
+            st.info(f"Explanation: {q['explanation']}")
+        st.divider()
+
+    # Display final score
+    score_percentage = (st.session_state.score / len(questions)) * 100
+    st.metric(
+        label="Your Score", 
+        value=f"{st.session_state.score}/{len(questions)}", 
+        delta=f"{score_percentage:.1f}%"
+    )
+    
+    # Feedback based on score
+    if score_percentage >= 80:
+        st.success("🎉 Excellent! You've mastered this content.")
+    elif score_percentage >= 60:
+        st.info("👍 Good job! You understand most of the material.")
+    else:
+        st.warning("📚 Keep studying! You might want to review the summary again.")
+    
+    # Restart button (the fragment reruns on its own after the callback)
+    st.button("Restart Quiz", on_click=_reset_quiz_answers, args=(len(questions),))
 
 def display_error(message: str):
     """Display an error message with styling."""
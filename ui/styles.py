@@ -322,9 +322,8 @@ def apply_print_styles():
     """, unsafe_allow_html=True)
 
 
-def apply_all_styles(include_dark_mode=False, include_responsive=True, include_print=True):
-    """Apply all styles with optional configs."""
-    set_page_config()
+def apply_styles(include_dark_mode=False, include_responsive=True, include_print=True):
+    """Apply all styles without touching the page config (set by the app itself)."""
     apply_custom_styles()
     
     if include_responsive:
@@ -335,3 +334,9 @@ def apply_all_styles(include_dark_mode=False, include_responsive=True, include_p
     
     if include_print:
         apply_print_styles()
+
+
+def apply_all_styles(include_dark_mode=False, include_responsive=True, include_print=True):
+    """Apply all styles with optional configs."""
+    set_page_config()
+    apply_styles(include_dark_mode, include_responsive, include_print)